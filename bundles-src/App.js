@@ -13,13 +13,20 @@ import NoResults from "./components/NoResults";
 
 import './css/App.css';
 
+// Catalog embedded into index.html by Django
+function readEmbeddedCatalog(){
+  const element = document.getElementById('catalog-data');
+  return element ? JSON.parse(element.textContent) : {banners: null, products: null};
+}
+
 class App extends Component {
 
   constructor(props){
     super();
+    const catalog = readEmbeddedCatalog();
     this.state = {
-      banners: [],  // null represent "Loading" state, will be replaced by Array on server response
-      products: null,  // null represent "Loading" state, will be replaced by Array on server response
+      banners: catalog.banners || [],
+      products: catalog.products,  // null represent "Loading" state, will be replaced by Array on server response
       term: '',
       cart: [],
       quickViewProduct: null,  // will be replaced by selected product attributes
@@ -138,8 +145,13 @@ class App extends Component {
   }
 
   componentDidMount(){
-    this.getProducts();
-    this.getBanners();
+    // The embedded catalog spares the round trips to the API
+    if (!this.state.products){
+      this.getProducts();
+    }
+    if (!this.state.banners.length){
+      this.getBanners();
+    }
   }
 
 
@@ -0,0 +1,104 @@
+#!/bin/bash
+set -euo pipefail
+
+# Every deploy is built in its own release directory while the current one keeps serving:
+#
+# /opt/star-burger/
+#     current -> releases/20220606193300
+#     releases/20220606193300/
+#     shared/.env
+#     shared/media/
+#     shared/venvs/<requirements.txt hash>/
+DEPLOY_ROOT=${DEPLOY_ROOT:-/opt/star-burger}
+REPO_URL=${REPO_URL:-$(git -C "$(dirname "$0")" remote get-url origin)}
+BRANCH=${BRANCH:-master}
+KEEP_RELEASES=${KEEP_RELEASES:-5}
+SERVICE=${SERVICE:-starburger-server.service}
+RELOAD_COMMAND=${RELOAD_COMMAND:-systemctl reload $SERVICE}
+RESTART_COMMAND=${RESTART_COMMAND:-systemctl restart $SERVICE}
+SMOKE_TEST_URL=${SMOKE_TEST_URL:-http://127.0.0.1:8000}
+SMOKE_TEST_DURATION=${SMOKE_TEST_DURATION:-10}
+
+RELEASES="$DEPLOY_ROOT/releases"
+SHARED="$DEPLOY_ROOT/shared"
+CURRENT="$DEPLOY_ROOT/current"
+RELEASE="$RELEASES/$(date +%Y%m%d%H%M%S)"
+
+switch_to() {
+    # rename() replaces the link atomically, so there is always a release to serve
+    ln -sfn "$1" "$CURRENT.new"
+    mv -T "$CURRENT.new" "$CURRENT"
+}
+
+read_env() {
+    # The same .env is read by django-environ, so the last assignment wins and quotes are optional
+    sed -n "s/^$1=//p" "$SHARED/.env" | tail -n 1 | sed -e 's/^["'\'']//' -e 's/["'\'']$//'
+}
+
+reload_app() {
+    local from_release=$1 to_release=$2
+    if [ -n "$from_release" ] && [ "$(readlink "$from_release/.venv")" = "$(readlink "$to_release/.venv")" ]; then
+        # New workers are started from the new release, old ones finish their requests and exit
+        $RELOAD_COMMAND
+    else
+        # The running master process can't move to another virtualenv
+        $RESTART_COMMAND
+    fi
+}
+
+echo "Building release $RELEASE..."
+mkdir -p "$RELEASES" "$SHARED/media" "$SHARED/venvs"
+git clone --quiet --depth 1 --branch "$BRANCH" "$REPO_URL" "$RELEASE"
+ln -s "$SHARED/.env" "$RELEASE/.env"
+ln -s "$SHARED/media" "$RELEASE/media"
+cd "$RELEASE"
+
+echo "Installing dependencies..."
+# Releases with the same requirements share a virtualenv
+VENV="$SHARED/venvs/$(sha1sum requirements.txt | cut -c 1-12)"
+if [ ! -d "$VENV" ]; then
+    python3 -m venv "$VENV"
+    "$VENV/bin/pip3" install --quiet -r requirements.txt || { rm -rf "$VENV"; exit 1; }
+fi
+ln -s "$VENV" .venv
+npm ci --dev
+
+echo "Setting up django..."
+./node_modules/.bin/parcel build bundles-src/index.js --dist-dir bundles --public-url="./"
+./.venv/bin/python3 manage.py collectstatic --noinput
+# The previous release keeps serving until the switch, so migrations must not break it
+./.venv/bin/python3 manage.py migrate --noinput
+
+echo "Switching to the new release..."
+PREVIOUS=$(readlink "$CURRENT" || true)
+switch_to "$RELEASE"
+reload_app "$PREVIOUS" "$RELEASE"
+
+echo "Smoke testing..."
+if ! ./.venv/bin/python3 manage.py smoke_test --url "$SMOKE_TEST_URL" --duration "$SMOKE_TEST_DURATION"; then
+    if [ -n "$PREVIOUS" ]; then
+        echo "Smoke test failed, rolling back to $PREVIOUS"
+        switch_to "$PREVIOUS"
+        reload_app "$RELEASE" "$PREVIOUS"
+    fi
+    exit 1
+fi
+
+echo "Removing old releases..."
+ls -1d "$RELEASES"/* | head -n -"$KEEP_RELEASES" | xargs -r rm -rf
+for venv in "$SHARED"/venvs/*; do
+    if ! readlink "$RELEASES"/*/.venv | grep -qxF "$venv"; then
+        rm -rf "$venv"
+    fi
+done
+
+ROLLBAR_ACCESS_TOKEN=$(read_env ROLLBAR_ACCESS_TOKEN)
+if [ -n "$ROLLBAR_ACCESS_TOKEN" ]; then
+    echo "Reporting to Rollbar..."
+    HASH=$(git rev-parse HEAD)
+    MESSAGE=$(git log -1 --pretty=%B)
+    ENVIRONMENT=$(read_env ROLLBAR_ENVIRONMENT)
+    curl -H "X-Rollbar-Access-Token: ${ROLLBAR_ACCESS_TOKEN}" -H "Content-Type: application/json" -X POST "https://api.rollbar.com/api/1/deploy" -d "{\"environment\": \"${ENVIRONMENT:-development}\", \"revision\": \"${HASH}\", \"comment\": \"${MESSAGE}\", \"status\": \"succeeded\"}"
+fi
+
+echo "Done."
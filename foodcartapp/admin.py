@@ -1,19 +1,32 @@
 from django import forms
 from django.contrib import admin
+from django.db.models import Q
 from django.shortcuts import reverse
-from django.templatetags.static import static
 from django.utils.http import url_has_allowed_host_and_scheme
+from django.utils.timezone import localtime
 from django.utils.html import format_html
 from django.http import HttpResponseRedirect
+from phonenumber_field.phonenumber import to_python
 
-from .models import Order, OrderItem, Product
+from star_burger.changelist import LargeTableAdminMixin
+
+from .models import ArchivedOrder, ArchivedOrderItem
+from .models import Order, OrderEvent, OrderItem, Product
 from .models import ProductCategory
 from .models import Restaurant
 from .models import RestaurantMenuItem
+from .models import get_avaliable_restaurants
+from .rollups import get_sales_watermark
 
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
+    autocomplete_fields = [
+        'product',
+    ]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
 
 
 class OrderAdminForm(forms.ModelForm):    
@@ -21,21 +34,59 @@ class OrderAdminForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         
         # Make sure to only list restaurants with matching avaliable products
-        order_items = [item.product.id for item in self.instance.items.all()]
-        restaurants_with_items = RestaurantMenuItem.objects.get_restaurants_with_items()
+        order_items = [item.product_id for item in self.instance.items.all()]
+        restaurants_menus = RestaurantMenuItem.objects.get_restaurants_menus()
 
         avaliable_restaurants = [
-            restaurant.id for restaurant, items in restaurants_with_items.items()
-            if set(items).issuperset(order_items)
+            restaurant.id for restaurant
+            in get_avaliable_restaurants(restaurants_menus, order_items)
         ]
 
         self.fields['assigned_restaurant'].queryset = Restaurant.objects.filter(id__in=avaliable_restaurants)
 
+    def clean(self):
+        cleaned_data = super().clean()
+        fulfilled_on = cleaned_data.get('fulfilled_on')
+        if cleaned_data.get('status') != Order.Status.FULFILLED or not fulfilled_on:
+            return cleaned_data
+        if not {'status', 'fulfilled_on'}.intersection(self.changed_data):
+            return cleaned_data
+
+        # rollup_sales has moved past this time and wouldn't count the order
+        watermark = get_sales_watermark()
+        if watermark is not None and fulfilled_on <= watermark:
+            self.add_error('fulfilled_on', f'Продажи до {localtime(watermark):%d.%m.%Y %H:%M} уже подсчитаны')
+        return cleaned_data
+
         
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     form = OrderAdminForm
 
+    list_display = [
+        'id',
+        'created_on',
+        'status',
+        'payment_method',
+        'assigned_restaurant',
+        'phonenumber',
+        'address',
+    ]
+    list_filter = [
+        'status',
+        'payment_method',
+        'assigned_restaurant',
+    ]
+    # Searched by get_search_results, the fields turn on the search box
+    search_fields = [
+        '=id',
+        '=phonenumber',
+    ]
+    list_select_related = [
+        'assigned_restaurant',
+    ]
+    date_hierarchy = 'created_on'
+
     fields = (
         ('phonenumber', 'firstname', 'lastname'),
         ('address'),
@@ -61,9 +112,30 @@ class OrderAdmin(admin.ModelAdmin):
             else generic_response
         )
 
+    def get_search_results(self, request, queryset, search_term):
+        # Order number or phone number, exact lookups are served by the indexes
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        lookups = Q()
+        if search_term.isdigit():
+            lookups |= Q(id=int(search_term))
+        phonenumber = to_python(search_term, region='RU')
+        if phonenumber and phonenumber.is_valid():
+            lookups |= Q(phonenumber=phonenumber)
+        if not lookups:
+            return queryset.none(), False
+        return queryset.filter(lookups), False
+
+
 class RestaurantMenuItemInline(admin.TabularInline):
     model = RestaurantMenuItem
     extra = 0
+    autocomplete_fields = [
+        'restaurant',
+        'product',
+    ]
 
 
 @admin.register(Restaurant)
@@ -77,6 +149,7 @@ class RestaurantAdmin(admin.ModelAdmin):
         'name',
         'address',
         'contact_phone',
+        'capacity',
     ]
     inlines = [
         RestaurantMenuItemInline
@@ -97,11 +170,9 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = [
         'category',
     ]
+    # Searched by get_search_results, the field turns on the search box
     search_fields = [
-        # FIXME SQLite can not convert letter case for cyrillic words properly, so search will be buggy.
-        # Migration to PostgreSQL is necessary
-        'name',
-        'category__name',
+        'search_document',
     ]
 
     inlines = [
@@ -135,7 +206,7 @@ class ProductAdmin(admin.ModelAdmin):
     class Media:
         css = {
             "all": (
-                static("admin/foodcartapp.css")
+                "admin/foodcartapp.css",
             )
         }
 
@@ -152,7 +223,85 @@ class ProductAdmin(admin.ModelAdmin):
         return format_html('<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>', edit_url=edit_url, src=obj.image.url)
     get_image_list_preview.short_description = 'превью'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Name and category name, case-insensitive for cyrillic on SQLite as well
+        return queryset.search(search_term), False
+
 
 @admin.register(ProductCategory)
 class ProductAdmin(admin.ModelAdmin):
     pass
+
+
+@admin.register(OrderEvent)
+class OrderEventAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = [
+        'seq',
+        'order_id',
+        'kind',
+        'status',
+        'assigned_restaurant_id',
+        'created_on',
+    ]
+    list_filter = [
+        'kind',
+    ]
+    search_fields = [
+        '=order_id',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    fields = ['product', 'price', 'quantity']
+    readonly_fields = fields
+    can_delete = False
+    extra = 0
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = [
+        'id',
+        'created_on',
+        'status',
+        'assigned_restaurant',
+        'phonenumber',
+        'address',
+    ]
+    list_filter = [
+        'status',
+    ]
+    search_fields = [
+        '=id',
+        'phonenumber',
+        'address',
+    ]
+    list_select_related = [
+        'assigned_restaurant',
+    ]
+    date_hierarchy = 'created_on'
+    inlines = [
+        ArchivedOrderItemInline
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
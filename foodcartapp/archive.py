@@ -0,0 +1,55 @@
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from .rollups import get_sales_watermark
+
+
+ORDER_FIELDS = [field.attname for field in Order._meta.concrete_fields]
+ORDER_ITEM_FIELDS = [field.attname for field in OrderItem._meta.concrete_fields]
+
+
+def get_archivable_orders(created_before):
+    '''Closed orders created before the date
+
+    Fulfilled orders are archived only once rolled up into sales,
+    rollup_sales reads the archive only when the rollup is rebuilt.
+    '''
+    closed = Q(status=Order.Status.CANCELED)
+    watermark = get_sales_watermark()
+    if watermark is not None:
+        closed |= Q(status=Order.Status.FULFILLED, fulfilled_on__lte=watermark)
+
+    return Order.objects.filter(closed, created_on__lt=created_before)
+
+
+def archive_batch(created_before, batch_size):
+    '''Move a batch of closed orders with their items to the archive tables
+
+    Returns the number of archived orders, 0 when nothing is left.
+    '''
+    with transaction.atomic():
+        order_ids = list(
+            get_archivable_orders(created_before)
+            .order_by('id')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not order_ids:
+            return 0
+
+        archived_on = timezone.now()
+        ArchivedOrder.objects.bulk_create([
+            ArchivedOrder(archived_on=archived_on, **order)
+            for order in Order.objects.filter(id__in=order_ids).values(*ORDER_FIELDS)
+        ])
+        ArchivedOrderItem.objects.bulk_create([
+            ArchivedOrderItem(**item)
+            for item in OrderItem.objects.filter(order_id__in=order_ids).values(*ORDER_ITEM_FIELDS)
+        ])
+
+        OrderItem.objects.filter(order_id__in=order_ids).delete()
+        Order.objects.filter(id__in=order_ids).delete()
+
+    return len(order_ids)
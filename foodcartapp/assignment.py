@@ -0,0 +1,160 @@
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from locations.models import Location
+
+from .models import Order, OrderEvent, Restaurant, RestaurantMenuItem, get_avaliable_restaurants
+from .restaurant_index import get_restaurant_index
+
+
+Candidate = namedtuple('Candidate', ['restaurant_id', 'distance', 'load', 'capacity'])
+
+
+class DistancePolicy:
+    '''Nearest restaurant wins'''
+
+    def score(self, candidate):
+        return candidate.distance
+
+
+class LoadPolicy:
+    '''Every order a restaurant is already cooking counts as extra kilometres'''
+
+    def __init__(self, km_per_order=None):
+        self.km_per_order = settings.LOAD_PENALTY_KM if km_per_order is None else km_per_order
+
+    def score(self, candidate):
+        return candidate.distance + candidate.load * self.km_per_order
+
+
+class CapacityPolicy:
+    '''Nearest restaurant that is not cooking at full capacity'''
+
+    def score(self, candidate):
+        if candidate.capacity is not None and candidate.load >= candidate.capacity:
+            return None
+        return candidate.distance
+
+
+POLICIES = {
+    'distance': DistancePolicy,
+    'load': LoadPolicy,
+    'capacity': CapacityPolicy,
+}
+
+
+def get_restaurants_load():
+    '''Number of open orders assigned to every restaurant, in a single query'''
+    return Counter(Restaurant.objects.get_active_orders())
+
+
+def plan_assignments(orders, restaurant_index, capacities, policy, load):
+    '''Pick a restaurant for every order
+
+    orders: iterable of (order_id, (lat, lon), set of candidate restaurant ids)
+    restaurant_index: GridIndex of restaurant coordinates
+    capacities: restaurant id -> capacity
+    load: Counter of active orders per restaurant, updated in place
+
+    Returns mapping of order id to restaurant id. Orders without
+    coordinates or acceptable candidates are left out.
+    '''
+    assignments = {}
+    for order_id, order_coords, restaurant_ids in orders:
+        if order_coords is None:
+            continue
+
+        best_score, best_restaurant_id = None, None
+        for distance, restaurant_id in restaurant_index.iter_nearest(*order_coords, restaurant_ids):
+            # No policy scores a restaurant better than its distance,
+            # so the rest of the restaurants can't win
+            if best_score is not None and distance >= best_score:
+                break
+
+            candidate = Candidate(restaurant_id, distance, load[restaurant_id], capacities[restaurant_id])
+            score = policy.score(candidate)
+            if score is not None and (best_score is None or score < best_score):
+                best_score, best_restaurant_id = score, restaurant_id
+
+        if best_restaurant_id is not None:
+            assignments[order_id] = best_restaurant_id
+            load[best_restaurant_id] += 1
+
+    return assignments
+
+
+def get_unassigned_orders():
+    return (
+        Order.objects
+        .filter(status=Order.Status.NEW, assigned_restaurant__isnull=True)
+        .order_by('created_on')
+    )
+
+
+def assign_new_orders(policy, batch_size=500, dry_run=False):
+    '''Assign a batch of NEW unassigned orders, oldest first
+
+    Returns the number of assigned orders.
+    '''
+    # The geocoder is slow, so addresses are fetched before any order is locked.
+    # Orders registered in between wait for the next batch
+    restaurant_index = get_restaurant_index()
+    Location.objects.get_for_addresses(set(get_unassigned_orders().values_list('address', flat=True)[:batch_size]))
+
+    with transaction.atomic():
+        orders = list(
+            get_unassigned_orders()
+            .prefetch_related('items')
+            .select_for_update(skip_locked=True, of=('self',))[:batch_size]
+        )
+        if not orders:
+            return 0
+
+        restaurants_menus = RestaurantMenuItem.objects.get_restaurants_menus()
+        locations = Location.objects.in_bulk({order.address for order in orders}, field_name='address')
+
+        planned_orders = []
+        for order in orders:
+            location = locations.get(order.address)
+            restaurants = get_avaliable_restaurants(
+                restaurants_menus,
+                [item.product_id for item in order.items.all()]
+            )
+            planned_orders.append((
+                order.id,
+                location.coords if location else None,
+                {restaurant.id for restaurant in restaurants},
+            ))
+        assignments = plan_assignments(
+            planned_orders,
+            restaurant_index,
+            dict(Restaurant.objects.values_list('id', 'capacity')),
+            policy,
+            get_restaurants_load(),
+        )
+
+        assigned_orders = []
+        now = timezone.now()
+        for order in orders:
+            if order.id in assignments:
+                order.assigned_restaurant_id = assignments[order.id]
+                # bulk_update skips auto_now
+                order.updated_on = now
+                assigned_orders.append(order)
+
+        if not dry_run:
+            Order.objects.bulk_update(
+                assigned_orders,
+                ['assigned_restaurant', 'updated_on'],
+                batch_size=batch_size,
+            )
+            # bulk_update sends no signals, so the events are logged here
+            OrderEvent.objects.bulk_create(
+                [OrderEvent.for_order(order, OrderEvent.Kind.ASSIGNED) for order in assigned_orders],
+                batch_size=batch_size,
+            )
+
+    return len(assigned_orders)
@@ -0,0 +1,11 @@
+CATALOG_PRODUCTS = 'catalog:products'
+CATALOG_BANNERS = 'catalog:banners'
+CATALOG_EMBEDDED = 'catalog:embedded'
+MENU_RESTAURANTS_WITH_ITEMS = 'menu:restaurants_with_items'
+
+CATALOG_KEYS = (
+    CATALOG_PRODUCTS,
+    CATALOG_BANNERS,
+    CATALOG_EMBEDDED,
+    MENU_RESTAURANTS_WITH_ITEMS,
+)
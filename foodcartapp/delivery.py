@@ -0,0 +1,31 @@
+from django.conf import settings
+
+from locations.models import Location
+
+from .models import RestaurantMenuItem, get_avaliable_restaurants
+from .restaurant_index import get_restaurant_index
+
+
+def is_in_delivery_zone(address, product_ids):
+    '''Whether a restaurant with all of the products is within DELIVERY_RADIUS_KM
+
+    None when it can't be told in time: the geocoder is down
+    or doesn't know the address. Such orders are let through.
+    '''
+    location = Location.objects.get_for_addresses({address})[address]
+    if location.coords is None:
+        return None
+
+    restaurant_ids = {
+        restaurant.id for restaurant in get_avaliable_restaurants(
+            RestaurantMenuItem.objects.get_restaurants_menus(),
+            product_ids,
+        )
+    }
+    nearest = get_restaurant_index().nearest(
+        *location.coords,
+        k=1,
+        radius_km=settings.DELIVERY_RADIUS_KM,
+        keys=restaurant_ids,
+    )
+    return bool(nearest)
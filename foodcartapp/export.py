@@ -0,0 +1,106 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import ArchivedOrderItem, Order, OrderItem
+
+
+EXPORT_FIELDS = [
+    ('order_id', 'order_id'),
+    ('created_on', 'order__created_on'),
+    ('fulfilled_on', 'order__fulfilled_on'),
+    ('status', 'order__status'),
+    ('payment_method', 'order__payment_method'),
+    ('restaurant', 'order__assigned_restaurant__name'),
+    ('firstname', 'order__firstname'),
+    ('lastname', 'order__lastname'),
+    ('phonenumber', 'order__phonenumber'),
+    ('address', 'order__address'),
+    ('product_id', 'product_id'),
+    ('product', 'product__name'),
+    ('price', 'price'),
+    ('quantity', 'quantity'),
+]
+EXPORT_FORMATS = ('csv', 'ndjson')
+STATUS_NAMES = {status: status.name.lower() for status in Order.Status}
+PAYMENT_METHOD_NAMES = {method: method.name.lower() for method in Order.PaymentMethod}
+
+# Rows are sent in chunks of about this size, not one by one
+BUFFER_SIZE = 64 * 1024
+
+
+def get_day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def get_export_items(date_from=None, date_to=None, statuses=None, archive=False):
+    '''Order items with their orders as value tuples in EXPORT_FIELDS order
+
+    date_to is inclusive. Archive exports read the archive tables.
+    '''
+    items = ArchivedOrderItem.objects.all() if archive else OrderItem.objects.all()
+    if date_from:
+        items = items.filter(order__created_on__gte=get_day_start(date_from))
+    if date_to:
+        items = items.filter(order__created_on__lt=get_day_start(date_to + timedelta(days=1)))
+    if statuses:
+        items = items.filter(order__status__in=statuses)
+
+    return items.order_by('order_id', 'id').values_list(*[lookup for _, lookup in EXPORT_FIELDS])
+
+
+def iter_export_rows(items, chunk_size=2000):
+    '''Rows as dicts, fetched through a server-side cursor where the DB has one'''
+    field_names = [name for name, _ in EXPORT_FIELDS]
+    for values in items.iterator(chunk_size=chunk_size):
+        row = dict(zip(field_names, values))
+        row['status'] = STATUS_NAMES[row['status']]
+        row['payment_method'] = PAYMENT_METHOD_NAMES[row['payment_method']]
+        row['phonenumber'] = str(row['phonenumber'])
+        yield row
+
+
+class LineBuffer:
+    '''File-like object for csv.writer which returns the written line'''
+
+    def write(self, value):
+        return value
+
+
+def iter_csv_lines(rows):
+    writer = csv.writer(LineBuffer())
+    yield writer.writerow([name for name, _ in EXPORT_FIELDS])
+    for row in rows:
+        yield writer.writerow([
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in row.values()
+        ])
+
+
+def iter_ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def iter_export(items, export_format, chunk_size=2000):
+    '''Exported text in chunks of about BUFFER_SIZE characters'''
+    return iter_export_chunks(iter_export_rows(items, chunk_size), export_format)
+
+
+def iter_export_chunks(rows, export_format):
+    lines = iter_csv_lines(rows) if export_format == 'csv' else iter_ndjson_lines(rows)
+
+    buffer = []
+    buffered_size = 0
+    for line in lines:
+        buffer.append(line)
+        buffered_size += len(line)
+        if buffered_size >= BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            buffered_size = 0
+    if buffer:
+        yield ''.join(buffer)
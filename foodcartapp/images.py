@@ -0,0 +1,90 @@
+import io
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+
+JPEG_OPTIONS = {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': True}
+WEBP_OPTIONS = {'format': 'WEBP', 'quality': 80, 'method': 6}
+# Pillow built from sources without libwebp can't write WebP, then only JPEG is made
+WEBP_SUPPORTED = features.check('webp')
+
+# Missing files, files that aren't images and images too large to decode
+IMAGE_ERRORS = (OSError, Image.DecompressionBombError)
+
+OptimizedImage = namedtuple(
+    'OptimizedImage',
+    ['jpeg_name', 'webp_name', 'original_size', 'jpeg_size', 'webp_size'],
+)
+
+
+def get_optimized_names(name):
+    '''Names of the JPEG and WebP versions stored next to the original
+
+    The whole name is kept, so burger.jpg and burger.png don't overwrite
+    each other's versions.
+    '''
+    return f'{name}.opt.jpg', f'{name}.opt.webp'
+
+
+def has_transparency(image):
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def encode(image, options):
+    # Metadata is written only when passed to save(), so EXIF, ICC and comments are dropped
+    buffer = io.BytesIO()
+    image.save(buffer, **options)
+    return buffer.getvalue()
+
+
+def save_replacing(storage, name, content):
+    # The storage would pick another name instead of overwriting
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(content))
+
+
+def optimize_image(name, max_size=None, storage=default_storage):
+    '''Save a progressive JPEG and a WebP of the image next to it
+
+    Both versions are downscaled to fit max_size pixels on the longest side,
+    rotated according to EXIF and stripped of metadata. The original is kept.
+    Raises one of IMAGE_ERRORS when the file can't be read as an image.
+    Without WebP support webp_name is empty.
+    '''
+    max_size = settings.PRODUCT_IMAGE_MAX_SIZE if max_size is None else max_size
+    with storage.open(name) as file, Image.open(file) as original:
+        original_size = file.size
+        # Phones store rotation in EXIF, which is dropped with the rest of metadata
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((max_size, max_size))
+
+    if has_transparency(image):
+        image = image.convert('RGBA')
+        jpeg_image = Image.new('RGB', image.size, 'white')
+        jpeg_image.paste(image, mask=image.getchannel('A'))
+        webp_image = image
+    else:
+        jpeg_image = webp_image = image.convert('RGB')
+
+    jpeg_name, webp_name = get_optimized_names(name)
+    jpeg_content = encode(jpeg_image, JPEG_OPTIONS)
+    jpeg_name = save_replacing(storage, jpeg_name, jpeg_content)
+    webp_content = b''
+    if WEBP_SUPPORTED:
+        webp_content = encode(webp_image, WEBP_OPTIONS)
+        webp_name = save_replacing(storage, webp_name, webp_content)
+    else:
+        webp_name = ''
+
+    return OptimizedImage(
+        jpeg_name=jpeg_name,
+        webp_name=webp_name,
+        original_size=original_size,
+        jpeg_size=len(jpeg_content),
+        webp_size=len(webp_content),
+    )
@@ -0,0 +1,43 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from foodcartapp.archive import archive_batch, get_archivable_orders
+
+
+class Command(BaseCommand):
+    help = 'Move fulfilled and canceled orders past the retention age to the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=90)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Seconds to sleep between batches to spare the primary DB'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only count orders to archive')
+
+    def handle(self, *args, **options):
+        created_before = timezone.now() - timedelta(days=options['older_than_days'])
+
+        if options['dry_run']:
+            count = get_archivable_orders(created_before).count()
+            self.stdout.write(f'{count} orders created before {created_before:%Y-%m-%d} to archive')
+            return
+
+        archived_count = 0
+        started_at = time.monotonic()
+        while True:
+            batch_count = archive_batch(created_before, options['batch_size'])
+            if not batch_count:
+                break
+            archived_count += batch_count
+            self.stdout.write(f'Archived {archived_count} orders')
+            time.sleep(options['pause'])
+
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived_count} orders in {elapsed:.1f}s'
+        ))
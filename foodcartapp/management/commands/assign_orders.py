@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.assignment import POLICIES, assign_new_orders
+
+
+class Command(BaseCommand):
+    help = 'Assign NEW orders to the best eligible restaurants in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--policy', choices=POLICIES, default='distance')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help='Keep running as a worker')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep when no orders are left')
+        parser.add_argument('--dry-run', action='store_true', help='Plan assignments without saving them')
+
+    def handle(self, *args, **options):
+        policy = POLICIES[options['policy']]()
+
+        while True:
+            started_at = time.monotonic()
+            assigned_count = assign_new_orders(policy, options['batch_size'], options['dry_run'])
+            elapsed = time.monotonic() - started_at
+
+            if assigned_count:
+                self.stdout.write(
+                    f'Assigned {assigned_count} orders in {elapsed:.2f}s '
+                    f'({assigned_count / elapsed:.0f} orders/s)'
+                )
+
+            if not options['loop']:
+                break
+            # Drain the backlog at full speed, then wait for new orders
+            if assigned_count < options['batch_size'] or options['dry_run']:
+                time.sleep(options['interval'])
@@ -0,0 +1,71 @@
+import random
+import statistics
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.assignment import POLICIES, plan_assignments
+from foodcartapp.testing import random_coords
+from locations.models import haversine_km
+from locations.spatial import GridIndex
+
+
+class Command(BaseCommand):
+    help = 'Simulate assignment of synthetic orders with every policy, no DB involved'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--restaurants', type=int, default=100)
+        parser.add_argument('--products', type=int, default=50)
+        parser.add_argument('--menu-coverage', type=float, default=0.9)
+        parser.add_argument('--capacity', type=int, default=150)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rand = random.Random(options['seed'])
+        product_ids = range(options['products'])
+
+        restaurants = {
+            restaurant_id: random_coords(rand) for restaurant_id in range(options['restaurants'])
+        }
+        restaurant_index = GridIndex()
+        for restaurant_id, coords in restaurants.items():
+            restaurant_index.add(restaurant_id, *coords)
+        capacities = dict.fromkeys(restaurants, options['capacity'])
+        menus = {
+            restaurant_id: {
+                product_id for product_id in product_ids
+                if rand.random() < options['menu_coverage']
+            }
+            for restaurant_id in restaurants
+        }
+
+        orders = []
+        for order_id in range(options['orders']):
+            ordered_products = rand.sample(product_ids, rand.randint(1, 4))
+            candidates = {
+                restaurant_id for restaurant_id, menu in menus.items()
+                if menu.issuperset(ordered_products)
+            }
+            orders.append((order_id, random_coords(rand), candidates))
+        orders_coords = {order_id: coords for order_id, coords, _ in orders}
+
+        for policy_name, policy_class in POLICIES.items():
+            load = Counter()
+            started_at = time.perf_counter()
+            assignments = plan_assignments(orders, restaurant_index, capacities, policy_class(), load)
+            elapsed = time.perf_counter() - started_at
+
+            distances = [
+                haversine_km(*orders_coords[order_id], *restaurants[restaurant_id])
+                for order_id, restaurant_id in assignments.items()
+            ]
+            # No order may be assignable, e.g. when every restaurant is out of zone
+            mean_km = f'{statistics.mean(distances):.2f}' if distances else '-'
+            self.stdout.write(
+                f'{policy_name:<9} {len(assignments) / elapsed:>8.0f} orders/s  '
+                f'assigned={len(assignments)}/{len(orders)}  '
+                f'mean_km={mean_km}  '
+                f'max_load={max(load.values(), default=0)}'
+            )
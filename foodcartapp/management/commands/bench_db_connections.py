@@ -0,0 +1,46 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from foodcartapp.views import serialize_products
+
+
+class Command(BaseCommand):
+    help = 'Compare request latency with per-request and persistent DB connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--conn-max-age', type=int, default=60)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+
+        for mode, conn_max_age in (
+            ('per-request', 0),
+            ('persistent', options['conn_max_age']),
+        ):
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+
+            timings = []
+            for _ in range(options['requests']):
+                started_at = time.perf_counter()
+                # Same hooks Django runs on request_started/request_finished
+                close_old_connections()
+                # The catalog API is served from the cache, which wouldn't touch the DB
+                serialize_products()
+                close_old_connections()
+                timings.append((time.perf_counter() - started_at) * 1000)
+
+            timings.sort()
+            self.stdout.write(
+                f'{mode:<12} conn_max_age={conn_max_age:<4} '
+                f'mean={statistics.mean(timings):.2f}ms '
+                f'p50={timings[len(timings) // 2]:.2f}ms '
+                f'p95={timings[int(len(timings) * 0.95)]:.2f}ms'
+            )
+
+        connection.close()
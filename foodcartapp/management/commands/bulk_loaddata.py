@@ -0,0 +1,132 @@
+import json
+import re
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.core.serializers.base import DeserializationError
+from django.core.serializers.python import Deserializer
+from django.db import IntegrityError, connection, transaction
+
+from foodcartapp import cache_keys
+from foodcartapp.models import Order, OrderItem, Product, ProductCategory, Restaurant, RestaurantMenuItem
+from locations.models import Location
+from star_burger.cache import invalidate
+
+
+# Every model goes after the models it refers to
+LOAD_ORDER = [ProductCategory, Product, Restaurant, RestaurantMenuItem, Order, OrderItem, Location]
+
+BLOCK_SIZE = 64 * 1024
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+def iter_json_array(file, block_size=BLOCK_SIZE):
+    '''Yield elements of a top-level JSON array, reading the file block by block'''
+    decoder = json.JSONDecoder()
+    buffer = file.read(block_size).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('Fixture is expected to be a JSON array')
+    position = 1
+
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if position < len(buffer) and buffer[position] == ']':
+            return
+
+        try:
+            element, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # The element is cut by the end of the block
+            block = file.read(block_size)
+            if not block:
+                raise
+            buffer = buffer[position:] + block
+            position = 0
+            continue
+        yield element
+
+
+class Command(BaseCommand):
+    help = (
+        'Load a dumpdata/data.json style fixture with bulk inserts. '
+        'Unlike loaddata no signals are sent and existing rows are not updated'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixture')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows inserted at once')
+
+    def handle(self, *args, **options):
+        self.chunk_size = options['chunk_size']
+        self.models = {model._meta.label_lower: model for model in LOAD_ORDER}
+        self.pending = defaultdict(list)
+        self.loaded = defaultdict(int)
+        self.insert_seconds = defaultdict(float)
+
+        started_at = time.monotonic()
+        try:
+            with open(options['fixture'], encoding='utf-8') as fixture, transaction.atomic():
+                # Foreign keys are checked on commit, so full chunks are inserted as they fill up.
+                # Whatever is left is inserted in dependency order
+                with connection.constraint_checks_disabled():
+                    for deserialized in Deserializer(self.iter_objects(fixture)):
+                        self.add(deserialized.object)
+                    for model in LOAD_ORDER:
+                        self.flush(model)
+                connection.check_constraints(table_names=[model._meta.db_table for model in self.loaded])
+                if Product in self.loaded or ProductCategory in self.loaded:
+                    Product.objects.update_search_documents()
+        except (ValueError, DeserializationError) as error:
+            raise CommandError(f'Invalid fixture: {error}')
+        except IntegrityError as error:
+            raise CommandError(f'Nothing loaded, fixture rows conflict with the DB: {error}')
+
+        self.reset_sequences()
+        invalidate(*cache_keys.CATALOG_KEYS)
+
+        for model in LOAD_ORDER:
+            if model in self.loaded:
+                loaded = self.loaded[model]
+                elapsed = self.insert_seconds[model]
+                self.stdout.write(
+                    f'{model._meta.verbose_name_plural}: {loaded} rows '
+                    f'({loaded / elapsed if elapsed else loaded:.0f} rows/s)'
+                )
+
+        elapsed = time.monotonic() - started_at
+        loaded = sum(self.loaded.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {loaded} rows in {elapsed:.1f}s ({loaded / elapsed if elapsed else loaded:.0f} rows/s)'
+        ))
+
+    def iter_objects(self, fixture):
+        for element in iter_json_array(fixture):
+            if element.get('model') not in self.models:
+                raise CommandError(
+                    f'{element.get("model")} is not supported by bulk_loaddata, use loaddata instead'
+                )
+            yield element
+
+    def add(self, instance):
+        model = type(instance)
+        self.pending[model].append(instance)
+        if len(self.pending[model]) >= self.chunk_size:
+            self.flush(model)
+
+    def flush(self, model):
+        instances = self.pending.pop(model, [])
+        if not instances:
+            return
+
+        started_at = time.monotonic()
+        model.objects.bulk_create(instances)
+        self.insert_seconds[model] += time.monotonic() - started_at
+        self.loaded[model] += len(instances)
+
+    def reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(no_style(), list(self.loaded))
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
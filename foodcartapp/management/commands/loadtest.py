@@ -0,0 +1,189 @@
+import json
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.test import Client
+
+from foodcartapp.models import Product
+
+
+MANAGER_USERNAME = 'loadtest-manager'
+# Run with the manager's session, other scenarios are anonymous customers
+MANAGER_SCENARIOS = {'poll_orders'}
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(sorted_values, share):
+    if not sorted_values:
+        return None
+    index = min(int(len(sorted_values) * share), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class LoadTest:
+    def __init__(self, base_url, product_ids, manager_session, seed):
+        self.base_url = base_url.rstrip('/')
+        self.product_ids = product_ids
+        self.manager_session = manager_session
+        self.seed = seed
+
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def request(self, session, endpoint, method, path, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            response = session.request(method, f'{self.base_url}{path}', timeout=30, **kwargs)
+            failed = response.status_code >= 400
+        except requests.RequestException:
+            failed = True
+        latency_ms = (time.perf_counter() - started_at) * 1000
+
+        with self.lock:
+            self.latencies[endpoint].append(latency_ms)
+            if failed:
+                self.errors[endpoint] += 1
+
+    def browse(self, session, rand):
+        self.request(session, 'GET /', 'GET', '/')
+        self.request(session, 'GET /api/products/', 'GET', '/api/products/')
+        self.request(session, 'GET /api/banners/', 'GET', '/api/banners/')
+
+    def order(self, session, rand):
+        products = rand.sample(self.product_ids, min(rand.randint(1, 4), len(self.product_ids)))
+        self.request(session, 'POST /api/order/', 'POST', '/api/order/', json={
+            'firstname': 'Нагрузка',
+            'lastname': 'Тестовая',
+            'phonenumber': f'+7916{rand.randrange(10 ** 7):07d}',
+            'address': f'Москва, ул. Нагрузочная, {rand.randrange(1, 500)}',
+            'products': [{'product': product_id, 'quantity': rand.randint(1, 3)} for product_id in products],
+        })
+
+    def poll_orders(self, session, rand):
+        self.request(session, 'GET /manager/orders/', 'GET', '/manager/orders/')
+
+    def run(self, mix, concurrency, duration):
+        names = list(mix)
+        weights = list(mix.values())
+        deadline = time.monotonic() + duration
+
+        def user_loop(user_number):
+            rand = random.Random(self.seed + user_number)
+            # DRF checks CSRF for logged in users, so customers can't share the manager's session
+            customer_session = requests.Session()
+            manager_session = requests.Session()
+            manager_session.cookies.set(settings.SESSION_COOKIE_NAME, self.manager_session)
+            while time.monotonic() < deadline:
+                name = rand.choices(names, weights)[0]
+                session = manager_session if name in MANAGER_SCENARIOS else customer_session
+                getattr(self, name)(session, rand)
+
+        started_at = time.monotonic()
+        users = [
+            threading.Thread(target=user_loop, args=(user_number,))
+            for user_number in range(concurrency)
+        ]
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        elapsed = time.monotonic() - started_at
+
+        return self.report(elapsed)
+
+    def report(self, elapsed):
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            latencies.sort()
+            endpoints[endpoint] = {
+                'requests': len(latencies),
+                'errors': self.errors[endpoint],
+                'throughput_rps': round(len(latencies) / elapsed, 2),
+                'mean_ms': round(statistics.mean(latencies), 2),
+                'p50_ms': round(percentile(latencies, 0.50), 2),
+                'p95_ms': round(percentile(latencies, 0.95), 2),
+                'p99_ms': round(percentile(latencies, 0.99), 2),
+            }
+
+        total_requests = sum(len(latencies) for latencies in self.latencies.values())
+        return {
+            'revision': settings.DEPLOY_REVISION,
+            'duration_s': round(elapsed, 2),
+            'requests': total_requests,
+            'errors': sum(self.errors.values()),
+            'throughput_rps': round(total_requests / elapsed, 2),
+            'endpoints': endpoints,
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        'Run lunch-rush load scenarios against a local server and report latency '
+        'percentiles and throughput per endpoint as JSON. Orders are written to the configured DB.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server. By default an in-process server with the fake geocoder is started'
+        )
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run')
+        parser.add_argument('--concurrency', type=int, default=10, help='Simultaneous users')
+        parser.add_argument('--browse', type=int, default=70, help='Weight of the catalog browsing scenario')
+        parser.add_argument('--order', type=int, default=20, help='Weight of the order submitting scenario')
+        parser.add_argument('--poll-orders', type=int, default=10, help='Weight of the manager polling scenario')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write JSON report to the file instead of stdout')
+
+    def handle(self, *args, **options):
+        product_ids = list(Product.objects.available().values_list('id', flat=True))
+        if not product_ids:
+            raise CommandError('No available products, fill the DB first, e.g. with seed_scale')
+
+        manager, _ = User.objects.get_or_create(username=MANAGER_USERNAME, defaults={'is_staff': True})
+        client = Client()
+        client.force_login(manager)
+        manager_session = client.cookies[settings.SESSION_COOKIE_NAME].value
+
+        server = None
+        base_url = options['url']
+        if not base_url:
+            settings.GEOCODER = 'fake'
+            server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+            server.set_app(get_wsgi_application())
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f'http://127.0.0.1:{server.server_port}'
+
+        mix = {
+            name: options[option]
+            for name, option in (('browse', 'browse'), ('order', 'order'), ('poll_orders', 'poll_orders'))
+            if options[option] > 0
+        }
+        load_test = LoadTest(base_url, product_ids, manager_session, options['seed'])
+        try:
+            report = load_test.run(mix, options['concurrency'], options['duration'])
+        finally:
+            if server:
+                server.shutdown()
+                server.server_close()
+
+        dumped_report = json.dumps(report, ensure_ascii=False, indent=4)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output_file:
+                output_file.write(dumped_report)
+        else:
+            self.stdout.write(dumped_report)
@@ -0,0 +1,99 @@
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from foodcartapp import cache_keys
+from foodcartapp.images import IMAGE_ERRORS, WEBP_SUPPORTED, optimize_image
+from foodcartapp.models import Product
+from foodcartapp.signals import delete_unused_images
+from star_burger.cache import invalidate
+
+
+class Command(BaseCommand):
+    help = (
+        'Save downscaled progressive JPEG and WebP versions without metadata next to product images. '
+        'Images are processed in parallel processes, products sharing an image get the same versions'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Number of processes. By default one per CPU'
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Optimize every image again, not only images without optimized versions'
+        )
+        parser.add_argument(
+            '--max-size', type=int,
+            help='Longest side of the optimized versions in pixels. By default PRODUCT_IMAGE_MAX_SIZE'
+        )
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='')
+        if not options['all']:
+            products = products.filter(optimized_image='')
+
+        product_ids = defaultdict(list)
+        previous_names = set()
+        for product_id, image_name, *optimized_names in products.values_list(
+            'id', 'image', 'optimized_image', 'webp_image',
+        ):
+            product_ids[image_name].append(product_id)
+            previous_names.update(optimized_names)
+        if not product_ids:
+            self.stdout.write('No images to optimize')
+            return
+
+        # Workers only read and write files, results are saved by this process.
+        # A forked DB connection must not be shared with them
+        connections.close_all()
+
+        started_at = time.monotonic()
+        optimized_count = original_size = jpeg_size = webp_size = 0
+        failed_names = []
+        # Under the spawn start method workers begin without Django set up
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as executor:
+            futures = {
+                executor.submit(optimize_image, image_name, options['max_size']): image_name
+                for image_name in product_ids
+            }
+            for future in as_completed(futures):
+                image_name = futures[future]
+                try:
+                    optimized = future.result()
+                except IMAGE_ERRORS as error:
+                    self.stderr.write(f'{image_name}: {error}')
+                    failed_names.append(image_name)
+                    continue
+
+                Product.objects.filter(id__in=product_ids[image_name]).update(
+                    optimized_image=optimized.jpeg_name,
+                    webp_image=optimized.webp_name,
+                )
+                optimized_count += 1
+                original_size += optimized.original_size
+                jpeg_size += optimized.jpeg_size
+                webp_size += optimized.webp_size
+
+        # update() sends no signals
+        invalidate(*cache_keys.CATALOG_KEYS)
+        # Versions saved under older naming schemes
+        delete_unused_images(previous_names)
+
+        elapsed = time.monotonic() - started_at
+        if optimized_count:
+            sizes = f'originals {original_size / 2 ** 20:.1f} MiB, JPEG {jpeg_size / 2 ** 20:.1f} MiB'
+            if WEBP_SUPPORTED:
+                sizes += f', WebP {webp_size / 2 ** 20:.1f} MiB'
+            self.stdout.write(self.style.SUCCESS(
+                f'Optimized {optimized_count} images in {elapsed:.1f}s '
+                f'({optimized_count / elapsed:.1f} images/s), {sizes}'
+            ))
+        if failed_names:
+            raise CommandError(f'{len(failed_names)} of {len(product_ids)} images are not optimized')
@@ -0,0 +1,44 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from foodcartapp.models import RollupWatermark, SalesRollup
+from foodcartapp.rollups import SALES_WATERMARK, rollup_sales
+
+
+class Command(BaseCommand):
+    help = 'Add orders fulfilled since the last run to the daily sales rollup'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lag-minutes', type=float, default=5,
+            help='Skip the most recent orders, they may be in not yet committed transactions'
+        )
+        parser.add_argument('--window-days', type=int, default=7, help='Period rolled up in one transaction')
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Drop the rollup and rebuild it from current and archived orders'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            with transaction.atomic():
+                SalesRollup.objects.all().delete()
+                RollupWatermark.objects.filter(name=SALES_WATERMARK).delete()
+
+        started_at = time.monotonic()
+        watermark = rollup_sales(
+            until=timezone.now() - timedelta(minutes=options['lag_minutes']),
+            window=timedelta(days=options['window_days']),
+        )
+
+        if watermark is None:
+            self.stdout.write('No fulfilled orders to roll up')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Sales are rolled up to {watermark:%Y-%m-%d %H:%M:%S} in {time.monotonic() - started_at:.1f}s, '
+            f'{SalesRollup.objects.count()} rollup rows'
+        ))
@@ -0,0 +1,249 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from foodcartapp import cache_keys
+from foodcartapp.models import Order, OrderItem, Product, ProductCategory, Restaurant, RestaurantMenuItem
+from foodcartapp.testing import MAX_LAT, MAX_LON, MIN_LAT, MIN_LON
+from locations.models import Location
+from star_burger.cache import invalidate
+
+
+BASE_RESTAURANTS = 3
+BASE_PRODUCTS = 4
+BASE_ORDERS = 100
+
+CATEGORIES = ['Бургер', 'Напиток', 'Десерт', 'Закуска', 'Салат']
+PRODUCT_ADJECTIVES = ['Двойной', 'Острый', 'Сырный', 'Лонг', 'Гранд', 'Мини', 'Царский', 'Фирменный']
+PRODUCT_NOUNS = ['Бургер', 'Чизбургер', 'Воппер', 'Ролл', 'Наггетс', 'Коктейль', 'Пирожок', 'Салат']
+IMAGES = ['steak.jpg', 'long_chiz.jpg', 'triple_vopper.jpg', 'beconizer.jpg']
+FIRSTNAMES = ['Иван', 'Мария', 'Пётр', 'Анна', 'Олег', 'Елена', 'Сергей', 'Ольга']
+LASTNAMES = ['Иванов', 'Петрова', 'Сидоров', 'Смирнова', 'Кузнецов', 'Попова', 'Волков', 'Соколова']
+STREETS = [
+    'ул. Тверская', 'ул. Арбат', 'Ленинский пр-т', 'ул. Чаянова', 'Кутузовский пр-т',
+    'ул. Покровка', 'ул. Маросейка', 'пр-т Мира', 'ул. Новый Арбат', 'ул. Пятницкая',
+]
+
+HISTORY_DAYS = 365
+
+
+def chunked(objects, chunk_size):
+    objects = iter(objects)
+    while True:
+        chunk = list(islice(objects, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def next_id(model):
+    return (model.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = 'Generate a reproducible dataset for scale testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=int, default=10,
+            help='Multiplier over data.json sized dataset, used for counts not given explicitly'
+        )
+        parser.add_argument('--restaurants', type=int)
+        parser.add_argument('--products', type=int)
+        parser.add_argument('--orders', type=int)
+        parser.add_argument('--max-items-per-order', type=int, default=5)
+        parser.add_argument(
+            '--menu-coverage', type=float, default=0.8,
+            help='Share of products on the menu of every restaurant'
+        )
+        parser.add_argument(
+            '--open-orders-share', type=float, default=0.02,
+            help='Share of NEW and CONFIRMED orders, the rest is history'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+
+        restaurants_count = options['restaurants'] or BASE_RESTAURANTS * options['scale']
+        products_count = options['products'] or BASE_PRODUCTS * options['scale']
+        orders_count = options['orders'] or BASE_ORDERS * options['scale']
+
+        started_at = time.monotonic()
+
+        category_ids = self.create_categories()
+        product_ids, prices = self.create_products(products_count, category_ids)
+        restaurant_ids, restaurant_addresses = self.create_restaurants(restaurants_count)
+        self.create_menu_items(restaurant_ids, product_ids, options['menu_coverage'])
+        order_addresses = self.create_orders(
+            orders_count,
+            restaurant_ids,
+            product_ids,
+            prices,
+            options['max_items_per_order'],
+            options['open_orders_share'],
+        )
+        self.create_locations(restaurant_addresses + order_addresses)
+
+        self.reset_sequences()
+        invalidate(*cache_keys.CATALOG_KEYS)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded in {time.monotonic() - started_at:.1f}s'
+        ))
+
+    def bulk_insert(self, model, objects):
+        created = 0
+        started_at = time.monotonic()
+        for chunk in chunked(objects, self.chunk_size):
+            with transaction.atomic():
+                model.objects.bulk_create(chunk, ignore_conflicts=model is Location)
+            created += len(chunk)
+
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(
+            f'{model._meta.verbose_name_plural}: {created} rows '
+            f'({created / elapsed if elapsed else created:.0f} rows/s)'
+        )
+
+    def create_categories(self):
+        existing = dict(ProductCategory.objects.values_list('name', 'id'))
+        missing = [name for name in CATEGORIES if name not in existing]
+        self.bulk_insert(ProductCategory, (ProductCategory(name=name) for name in missing))
+        return list(ProductCategory.objects.filter(name__in=CATEGORIES).values_list('id', flat=True))
+
+    def create_products(self, count, category_ids):
+        first_id = next_id(Product)
+        product_ids = list(range(first_id, first_id + count))
+        prices = {
+            product_id: Decimal(self.random.randrange(99, 999)) for product_id in product_ids
+        }
+
+        self.bulk_insert(Product, (
+            Product(
+                id=product_id,
+                name=f'{self.random.choice(PRODUCT_ADJECTIVES)} {self.random.choice(PRODUCT_NOUNS)} {product_id}',
+                category_id=self.random.choice(category_ids),
+                price=prices[product_id],
+                image=self.random.choice(IMAGES),
+                special_status=self.random.random() < 0.1,
+                description='Сгенерировано командой seed_scale',
+            )
+            for product_id in product_ids
+        ))
+        Product.objects.filter(id__gte=first_id).update_search_documents()
+        return product_ids, prices
+
+    def random_address(self):
+        return f'Москва, {self.random.choice(STREETS)}, {self.random.randrange(1, 200)}'
+
+    def create_restaurants(self, count):
+        first_id = next_id(Restaurant)
+        restaurant_ids = list(range(first_id, first_id + count))
+        addresses = [
+            f'{self.random_address()}, стр. {restaurant_id}' for restaurant_id in restaurant_ids
+        ]
+
+        self.bulk_insert(Restaurant, (
+            Restaurant(
+                id=restaurant_id,
+                name=f'Star Burger #{restaurant_id}',
+                address=address,
+                contact_phone=f'+7495{self.random.randrange(10 ** 7):07d}',
+            )
+            for restaurant_id, address in zip(restaurant_ids, addresses)
+        ))
+        return restaurant_ids, addresses
+
+    def create_menu_items(self, restaurant_ids, product_ids, coverage):
+        self.bulk_insert(RestaurantMenuItem, (
+            RestaurantMenuItem(
+                restaurant_id=restaurant_id,
+                product_id=product_id,
+                availability=self.random.random() < 0.95,
+            )
+            for restaurant_id in restaurant_ids
+            for product_id in product_ids
+            if self.random.random() < coverage
+        ))
+
+    def create_orders(self, count, restaurant_ids, product_ids, prices, max_items, open_share):
+        first_id = next_id(Order)
+        order_ids = range(first_id, first_id + count)
+        # Customers order to the same places, so addresses repeat
+        addresses = [self.random_address() for _ in range(max(count // 3, 1))]
+        now = timezone.now()
+
+        def generate_order(order_id):
+            created_on = now - timedelta(seconds=self.random.randrange(HISTORY_DAYS * 24 * 3600))
+            if self.random.random() < open_share:
+                status = self.random.choice([Order.Status.NEW, Order.Status.CONFIRMED])
+                created_on = now - timedelta(seconds=self.random.randrange(3 * 3600))
+            else:
+                status = Order.Status.FULFILLED if self.random.random() < 0.9 else Order.Status.CANCELED
+
+            confirmed_on = fulfilled_on = None
+            if status != Order.Status.NEW:
+                confirmed_on = created_on + timedelta(minutes=self.random.randrange(1, 15))
+            if status == Order.Status.FULFILLED:
+                fulfilled_on = confirmed_on + timedelta(minutes=self.random.randrange(20, 90))
+
+            return Order(
+                id=order_id,
+                firstname=self.random.choice(FIRSTNAMES),
+                lastname=self.random.choice(LASTNAMES),
+                phonenumber=f'+7916{self.random.randrange(10 ** 7):07d}',
+                address=self.random.choice(addresses),
+                status=status,
+                payment_method=self.random.choice(Order.PaymentMethod.values),
+                assigned_restaurant_id=(
+                    self.random.choice(restaurant_ids) if status != Order.Status.NEW else None
+                ),
+                created_on=created_on,
+                confirmed_on=confirmed_on,
+                fulfilled_on=fulfilled_on,
+            )
+
+        def generate_items():
+            for order_id in order_ids:
+                items_count = self.random.randint(1, max_items)
+                for product_id in self.random.sample(product_ids, min(items_count, len(product_ids))):
+                    yield OrderItem(
+                        order_id=order_id,
+                        product_id=product_id,
+                        price=prices[product_id],
+                        quantity=self.random.randint(1, 3),
+                    )
+
+        self.bulk_insert(Order, (generate_order(order_id) for order_id in order_ids))
+        self.bulk_insert(OrderItem, generate_items())
+        return addresses
+
+    def create_locations(self, addresses):
+        fetched_on = timezone.now()
+        self.bulk_insert(Location, (
+            Location(
+                address=address,
+                lat=round(self.random.uniform(MIN_LAT, MAX_LAT), 6),
+                lon=round(self.random.uniform(MIN_LON, MAX_LON), 6),
+                fetched_on=fetched_on,
+            )
+            for address in dict.fromkeys(addresses)
+        ))
+
+    def reset_sequences(self):
+        models = [Product, ProductCategory, Restaurant, RestaurantMenuItem, Order, OrderItem, Location]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
@@ -0,0 +1,93 @@
+import json
+import time
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from .loadtest import percentile
+
+
+DEFAULT_PATHS = ['/', '/api/products/', '/api/banners/']
+
+
+def get_longest_outage(results):
+    '''Longest time from a failed request to the next successful one'''
+    longest_outage = 0
+    outage_started_at = None
+    for started_at, _, latency_ms, ok in results:
+        if not ok and outage_started_at is None:
+            outage_started_at = started_at
+        elif ok and outage_started_at is not None:
+            longest_outage = max(longest_outage, started_at - outage_started_at)
+            outage_started_at = None
+
+    if outage_started_at is not None:
+        started_at, _, latency_ms, _ = results[-1]
+        longest_outage = max(longest_outage, started_at + latency_ms / 1000 - outage_started_at)
+    return longest_outage
+
+
+class Command(BaseCommand):
+    help = (
+        'Request the site pages one after another and report failed requests, the longest outage '
+        'and latencies as JSON. Run it during a deploy to measure downtime and cold start'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of a running server')
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help=f'Page to request, may be repeated. By default {", ".join(DEFAULT_PATHS)}'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=0,
+            help='Seconds to keep requesting. By default every page is requested once'
+        )
+        parser.add_argument('--interval', type=float, default=0.05, help='Seconds between requests')
+        parser.add_argument('--timeout', type=float, default=10, help='Seconds to wait for a response')
+
+    def handle(self, *args, **options):
+        base_url = options['url'].rstrip('/')
+        paths = options['paths'] or DEFAULT_PATHS
+        session = requests.Session()
+
+        # (seconds since start, path, latency, succeeded)
+        results = []
+        started_at = time.monotonic()
+        deadline = started_at + options['duration']
+        while True:
+            for path in paths:
+                request_started_at = time.monotonic()
+                try:
+                    response = session.get(f'{base_url}{path}', timeout=options['timeout'])
+                    ok = response.status_code < 400
+                except requests.RequestException:
+                    ok = False
+                latency_ms = (time.monotonic() - request_started_at) * 1000
+                results.append((request_started_at - started_at, path, latency_ms, ok))
+                time.sleep(options['interval'])
+
+            if time.monotonic() >= deadline:
+                break
+
+        latencies = sorted(latency_ms for _, _, latency_ms, _ in results)
+        slowest_at, slowest_path, slowest_ms, _ = max(results, key=lambda result: result[2])
+        errors = sum(not ok for *_, ok in results)
+        report = {
+            'duration_s': round(time.monotonic() - started_at, 2),
+            'requests': len(results),
+            'errors': errors,
+            'longest_outage_s': round(get_longest_outage(results), 2),
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            # A worker that has just started answers its first requests much slower
+            'slowest': {
+                'path': slowest_path,
+                'at_s': round(slowest_at, 2),
+                'latency_ms': round(slowest_ms, 2),
+            },
+        }
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=4))
+
+        if errors:
+            raise CommandError(f'{errors} of {len(results)} requests failed')
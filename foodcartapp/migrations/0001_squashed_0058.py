@@ -0,0 +1,202 @@
+# Generated by Django 3.2 on 2026-10-19 18:10
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import phonenumber_field.modelfields
+
+
+class Migration(migrations.Migration):
+
+    replaces = [('foodcartapp', '0001_initial'), ('foodcartapp', '0002_auto_20200619_0836'), ('foodcartapp', '0003_auto_20200619_0838'), ('foodcartapp', '0004_auto_20200619_0843'), ('foodcartapp', '0005_auto_20200619_0845'), ('foodcartapp', '0006_auto_20200619_0849'), ('foodcartapp', '0007_auto_20200619_0849'), ('foodcartapp', '0008_hotel_city'), ('foodcartapp', '0009_auto_20200619_0919'), ('foodcartapp', '0010_auto_20200619_0921'), ('foodcartapp', '0011_auto_20200619_0922'), ('foodcartapp', '0012_auto_20200619_0924'), ('foodcartapp', '0013_auto_20200619_0932'), ('foodcartapp', '0014_auto_20200619_0934'), ('foodcartapp', '0015_auto_20200619_0935'), ('foodcartapp', '0016_restaurant_new_admin'), ('foodcartapp', '0017_auto_20200619_0945'), ('foodcartapp', '0018_remove_restaurant_admin'), ('foodcartapp', '0019_auto_20200619_0948'), ('foodcartapp', '0020_auto_20200619_0959'), ('foodcartapp', '0021_auto_20200619_1002'), ('foodcartapp', '0022_auto_20200619_1003'), ('foodcartapp', '0023_auto_20200620_0942'), ('foodcartapp', '0024_product_ingridients'), ('foodcartapp', '0025_auto_20200629_1004'), ('foodcartapp', '0026_restaurantmenuitem'), ('foodcartapp', '0027_auto_20200629_1022'), ('foodcartapp', '0028_auto_20200629_1024'), ('foodcartapp', '0029_remove_product_category'), ('foodcartapp', '0030_auto_20200629_1341'), ('foodcartapp', '0031_auto_20200703_0612'), ('foodcartapp', '0032_remove_restaurant_admin'), ('foodcartapp', '0033_auto_20200928_1930'), ('foodcartapp', '0034_auto_20200928_1930'), ('foodcartapp', '0035_auto_20200928_1941'), ('foodcartapp', '0036_auto_20210125_1532'), ('foodcartapp', '0037_auto_20210125_1833'), ('foodcartapp', '0038_order_orderitem'), ('foodcartapp', '0039_auto_20220513_1813'), ('foodcartapp', '0040_auto_20220513_1815'), ('foodcartapp', '0041_alter_orderitem_price'), ('foodcartapp', '0042_order_status_squashed_0043_alter_order_status'), ('foodcartapp', '0043_order_note'), ('foodcartapp', '0044_auto_20220516_1513'), ('foodcartapp', '0045_auto_20220516_1524'), ('foodcartapp', '0046_auto_20220516_1531'), ('foodcartapp', '0047_order_assigned_restaurant'), ('foodcartapp', '0048_alter_order_assigned_restaurant'), ('foodcartapp', '0049_alter_order_assigned_restaurant'), ('foodcartapp', '0050_alter_order_payment_method'), ('foodcartapp', '0051_auto_20220606_1933'), ('foodcartapp', '0052_alter_order_note'), ('foodcartapp', '0053_restaurant_capacity'), ('foodcartapp', '0054_order_updated_on'), ('foodcartapp', '0055_orderevent'), ('foodcartapp', '0056_archivedorder'), ('foodcartapp', '0057_order_partial_indexes'), ('foodcartapp', '0058_salesrollup')]
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Restaurant',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, verbose_name='название')),
+                ('address', models.CharField(blank=True, db_index=True, max_length=100, verbose_name='адрес')),
+                ('contact_phone', models.CharField(blank=True, max_length=50, verbose_name='контактный телефон')),
+                ('capacity', models.PositiveSmallIntegerField(blank=True, help_text='сколько заказов ресторан готовит одновременно, пусто - без ограничений', null=True, verbose_name='вместимость')),
+            ],
+            options={
+                'verbose_name': 'ресторан',
+                'verbose_name_plural': 'рестораны',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductCategory',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, verbose_name='название')),
+            ],
+            options={
+                'verbose_name': 'категория',
+                'verbose_name_plural': 'категории',
+            },
+        ),
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, verbose_name='название')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8, validators=[django.core.validators.MinValueValidator(0)], verbose_name='цена')),
+                ('image', models.ImageField(upload_to='', verbose_name='картинка')),
+                ('special_status', models.BooleanField(db_index=True, default=False, verbose_name='спец.предложение')),
+                ('description', models.TextField(blank=True, max_length=200, verbose_name='описание')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='products', to='foodcartapp.productcategory', verbose_name='категория')),
+            ],
+            options={
+                'verbose_name': 'товар',
+                'verbose_name_plural': 'товары',
+            },
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('firstname', models.CharField(max_length=40, verbose_name='Имя')),
+                ('lastname', models.CharField(max_length=40, verbose_name='Фамилия')),
+                ('phonenumber', phonenumber_field.modelfields.PhoneNumberField(db_index=True, max_length=128, region=None, verbose_name='Номер телефона')),
+                ('address', models.CharField(db_index=True, max_length=200, verbose_name='Адрес')),
+                ('status', models.SmallIntegerField(choices=[(0, 'Необработанный'), (1, 'Обработанный'), (2, 'Отмененный'), (3, 'Исполненный')], db_index=True, default=0, verbose_name='Статус заказа')),
+                ('note', models.TextField(blank=True, verbose_name='Комментарий')),
+                ('confirmed_on', models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Дата/время подтверждения')),
+                ('created_on', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Дата/время создания')),
+                ('fulfilled_on', models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Дата/время исполнения')),
+                ('payment_method', models.SmallIntegerField(choices=[(0, 'Не выбрано'), (1, 'Наличные'), (2, 'Электронная')], db_index=True, default=0, verbose_name='Способ оплаты')),
+                ('assigned_restaurant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='foodcartapp.restaurant', verbose_name='Готовится в ресторане')),
+                ('updated_on', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата/время изменения')),
+            ],
+            options={
+                'verbose_name': 'Заказ',
+                'verbose_name_plural': 'Заказы',
+            },
+        ),
+        migrations.CreateModel(
+            name='RestaurantMenuItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('availability', models.BooleanField(db_index=True, default=True, verbose_name='в продаже')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='menu_items', to='foodcartapp.product', verbose_name='продукт')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='menu_items', to='foodcartapp.restaurant', verbose_name='ресторан')),
+            ],
+            options={
+                'verbose_name': 'пункт меню ресторана',
+                'verbose_name_plural': 'пункты меню ресторана',
+                'unique_together': {('restaurant', 'product')},
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.SmallIntegerField(validators=[django.core.validators.MinValueValidator(1)], verbose_name='Количество')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='foodcartapp.order', verbose_name='Заказ')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demands', to='foodcartapp.product', verbose_name='Товар')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8, validators=[django.core.validators.MinValueValidator(0)], verbose_name='цена за шт')),
+            ],
+            options={
+                'verbose_name': 'Позиция заказа',
+                'verbose_name_plural': 'Позиции в заказе',
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False, verbose_name='Номер события')),
+                ('order_id', models.IntegerField(db_index=True, verbose_name='ID заказа')),
+                ('kind', models.SmallIntegerField(choices=[(0, 'Создан'), (1, 'Изменён статус'), (2, 'Назначен ресторан'), (3, 'Изменён')], verbose_name='Событие')),
+                ('status', models.SmallIntegerField(choices=[(0, 'Необработанный'), (1, 'Обработанный'), (2, 'Отмененный'), (3, 'Исполненный')], verbose_name='Статус заказа')),
+                ('assigned_restaurant_id', models.IntegerField(blank=True, null=True, verbose_name='ID ресторана')),
+                ('created_on', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата/время события')),
+            ],
+            options={
+                'verbose_name': 'Событие заказа',
+                'verbose_name_plural': 'События заказов',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False, verbose_name='ID заказа')),
+                ('firstname', models.CharField(max_length=40, verbose_name='Имя')),
+                ('lastname', models.CharField(max_length=40, verbose_name='Фамилия')),
+                ('phonenumber', phonenumber_field.modelfields.PhoneNumberField(max_length=128, region=None, verbose_name='Номер телефона')),
+                ('address', models.CharField(max_length=200, verbose_name='Адрес')),
+                ('status', models.SmallIntegerField(choices=[(0, 'Необработанный'), (1, 'Обработанный'), (2, 'Отмененный'), (3, 'Исполненный')], verbose_name='Статус заказа')),
+                ('payment_method', models.SmallIntegerField(choices=[(0, 'Не выбрано'), (1, 'Наличные'), (2, 'Электронная')], verbose_name='Способ оплаты')),
+                ('note', models.TextField(blank=True, verbose_name='Комментарий')),
+                ('created_on', models.DateTimeField(db_index=True, verbose_name='Дата/время создания')),
+                ('confirmed_on', models.DateTimeField(blank=True, null=True, verbose_name='Дата/время подтверждения')),
+                ('fulfilled_on', models.DateTimeField(blank=True, null=True, verbose_name='Дата/время исполнения')),
+                ('updated_on', models.DateTimeField(verbose_name='Дата/время изменения')),
+                ('archived_on', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата/время архивации')),
+                ('assigned_restaurant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_orders', to='foodcartapp.restaurant', verbose_name='Готовился в ресторане')),
+            ],
+            options={
+                'verbose_name': 'Архивный заказ',
+                'verbose_name_plural': 'Архивные заказы',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False, verbose_name='ID позиции')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8, verbose_name='цена за шт')),
+                ('quantity', models.SmallIntegerField(verbose_name='Количество')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='foodcartapp.archivedorder', verbose_name='Заказ')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_demands', to='foodcartapp.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Позиция архивного заказа',
+                'verbose_name_plural': 'Позиции архивных заказов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(status__in=[0, 1]), fields=['status', 'created_on'], name='order_open_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('assigned_restaurant__isnull', True), ('status', 0)), fields=['created_on'], name='order_unassigned_created_idx'),
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='название')),
+                ('value', models.DateTimeField(blank=True, null=True, verbose_name='обработано до')),
+            ],
+            options={
+                'verbose_name': 'отметка агрегации',
+                'verbose_name_plural': 'отметки агрегации',
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True, verbose_name='день')),
+                ('quantity', models.PositiveIntegerField(default=0, verbose_name='продано, шт')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='выручка')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='заказов')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales', to='foodcartapp.product', verbose_name='товар')),
+                ('restaurant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sales', to='foodcartapp.restaurant', verbose_name='ресторан')),
+            ],
+            options={
+                'verbose_name': 'продажи за день',
+                'verbose_name_plural': 'продажи по дням',
+                'unique_together': {('restaurant', 'product', 'day')},
+            },
+        ),
+    ]
@@ -17,5 +17,5 @@ class Migration(migrations.Migration):
     ]
 
     operations = [
-        migrations.RunPython(fill_city_field),
+        migrations.RunPython(fill_city_field, elidable=True),
     ]
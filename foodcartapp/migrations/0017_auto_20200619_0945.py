@@ -17,5 +17,5 @@ class Migration(migrations.Migration):
     ]
 
     operations = [
-        migrations.RunPython(fill_new_admin_field),
+        migrations.RunPython(fill_new_admin_field, elidable=True),
     ]
@@ -17,5 +17,5 @@ class Migration(migrations.Migration):
     ]
 
     operations = [
-        migrations.RunPython(set_backdate_order_prices)
+        migrations.RunPython(set_backdate_order_prices, elidable=True)
     ]
@@ -5,8 +5,6 @@ from django.db import migrations, models
 
 class Migration(migrations.Migration):
 
-    replaces = [('foodcartapp', '0042_order_status'), ('foodcartapp', '0043_alter_order_status')]
-
     dependencies = [
         ('foodcartapp', '0041_alter_orderitem_price'),
     ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-19 17:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0052_alter_order_note'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='capacity',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='сколько заказов ресторан готовит одновременно, пусто - без ограничений', null=True, verbose_name='вместимость'),
+        ),
+    ]
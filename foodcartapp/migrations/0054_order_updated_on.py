@@ -0,0 +1,20 @@
+# Generated by Django 3.2 on 2026-10-19 17:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0053_restaurant_capacity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='updated_on',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата/время изменения'),
+            preserve_default=False,
+        ),
+    ]
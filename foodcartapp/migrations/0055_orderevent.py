@@ -0,0 +1,29 @@
+# Generated by Django 3.2 on 2026-10-19 17:38
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0054_order_updated_on'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False, verbose_name='Номер события')),
+                ('order_id', models.IntegerField(db_index=True, verbose_name='ID заказа')),
+                ('kind', models.SmallIntegerField(choices=[(0, 'Создан'), (1, 'Изменён статус'), (2, 'Назначен ресторан'), (3, 'Изменён')], verbose_name='Событие')),
+                ('status', models.SmallIntegerField(choices=[(0, 'Необработанный'), (1, 'Обработанный'), (2, 'Отмененный'), (3, 'Исполненный')], verbose_name='Статус заказа')),
+                ('assigned_restaurant_id', models.IntegerField(blank=True, null=True, verbose_name='ID ресторана')),
+                ('created_on', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата/время события')),
+            ],
+            options={
+                'verbose_name': 'Событие заказа',
+                'verbose_name_plural': 'События заказов',
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 3.2 on 2026-10-19 17:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import phonenumber_field.modelfields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0055_orderevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False, verbose_name='ID заказа')),
+                ('firstname', models.CharField(max_length=40, verbose_name='Имя')),
+                ('lastname', models.CharField(max_length=40, verbose_name='Фамилия')),
+                ('phonenumber', phonenumber_field.modelfields.PhoneNumberField(max_length=128, region=None, verbose_name='Номер телефона')),
+                ('address', models.CharField(max_length=200, verbose_name='Адрес')),
+                ('status', models.SmallIntegerField(choices=[(0, 'Необработанный'), (1, 'Обработанный'), (2, 'Отмененный'), (3, 'Исполненный')], verbose_name='Статус заказа')),
+                ('payment_method', models.SmallIntegerField(choices=[(0, 'Не выбрано'), (1, 'Наличные'), (2, 'Электронная')], verbose_name='Способ оплаты')),
+                ('note', models.TextField(blank=True, verbose_name='Комментарий')),
+                ('created_on', models.DateTimeField(db_index=True, verbose_name='Дата/время создания')),
+                ('confirmed_on', models.DateTimeField(blank=True, null=True, verbose_name='Дата/время подтверждения')),
+                ('fulfilled_on', models.DateTimeField(blank=True, null=True, verbose_name='Дата/время исполнения')),
+                ('updated_on', models.DateTimeField(verbose_name='Дата/время изменения')),
+                ('archived_on', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата/время архивации')),
+                ('assigned_restaurant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_orders', to='foodcartapp.restaurant', verbose_name='Готовился в ресторане')),
+            ],
+            options={
+                'verbose_name': 'Архивный заказ',
+                'verbose_name_plural': 'Архивные заказы',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False, verbose_name='ID позиции')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8, verbose_name='цена за шт')),
+                ('quantity', models.SmallIntegerField(verbose_name='Количество')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='foodcartapp.archivedorder', verbose_name='Заказ')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_demands', to='foodcartapp.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Позиция архивного заказа',
+                'verbose_name_plural': 'Позиции архивных заказов',
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2 on 2026-10-19 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0056_archivedorder'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(status__in=[0, 1]), fields=['status', 'created_on'], name='order_open_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('assigned_restaurant__isnull', True), ('status', 0)), fields=['created_on'], name='order_unassigned_created_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2 on 2026-10-19 17:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0057_order_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='название')),
+                ('value', models.DateTimeField(blank=True, null=True, verbose_name='обработано до')),
+            ],
+            options={
+                'verbose_name': 'отметка агрегации',
+                'verbose_name_plural': 'отметки агрегации',
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True, verbose_name='день')),
+                ('quantity', models.PositiveIntegerField(default=0, verbose_name='продано, шт')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='выручка')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='заказов')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales', to='foodcartapp.product', verbose_name='товар')),
+                ('restaurant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sales', to='foodcartapp.restaurant', verbose_name='ресторан')),
+            ],
+            options={
+                'verbose_name': 'продажи за день',
+                'verbose_name_plural': 'продажи по дням',
+                'unique_together': {('restaurant', 'product', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-19 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0001_squashed_0058'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='optimized_image',
+            field=models.ImageField(blank=True, editable=False, upload_to='', verbose_name='сжатая картинка'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='webp_image',
+            field=models.ImageField(blank=True, editable=False, upload_to='', verbose_name='картинка WebP'),
+        ),
+    ]
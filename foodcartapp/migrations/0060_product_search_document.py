@@ -0,0 +1,47 @@
+# Generated by Django 3.2 on 2026-10-19 18:30
+
+from django.db import migrations, models
+
+
+def fill_search_documents(apps, schema_editor):
+    Product = apps.get_model('foodcartapp', 'Product')
+    products = []
+    for product in Product.objects.select_related('category').iterator():
+        category_name = product.category.name if product.category else ''
+        product.search_document = f'{product.name} {category_name}'.strip().casefold().replace('ё', 'е')
+        products.append(product)
+    Product.objects.bulk_update(products, ['search_document'], batch_size=1000)
+
+
+def create_search_index(apps, schema_editor):
+    # Trigram GIN index serves LIKE '%word%', other databases scan the table
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX foodcartapp_product_search_trgm '
+        'ON foodcartapp_product USING gin (search_document gin_trgm_ops)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS foodcartapp_product_search_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0059_product_optimized_images'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False, verbose_name='текст для поиска'),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop, elidable=True),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2 on 2026-10-19 19:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0060_product_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='updated_on',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='дата/время изменения'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2 on 2026-10-19 19:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0061_restaurant_updated_on'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedorderitem',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_demands', to='foodcartapp.product', verbose_name='Товар'),
+        ),
+    ]
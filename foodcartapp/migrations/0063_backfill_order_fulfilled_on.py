@@ -0,0 +1,32 @@
+# Generated by Django 3.2 on 2026-10-19 20:10
+
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import F
+
+
+FULFILLED = 3
+
+
+def backfill_fulfilled_on(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    RollupWatermark = apps.get_model('foodcartapp', 'RollupWatermark')
+
+    orders = Order.objects.filter(status=FULFILLED, fulfilled_on__isnull=True)
+    watermark = RollupWatermark.objects.filter(name='sales').values_list('value', flat=True).first()
+    if watermark is not None:
+        # Days up to the watermark are rolled up already, these orders are counted right after it
+        orders.filter(updated_on__lte=watermark).update(fulfilled_on=watermark + timedelta(microseconds=1))
+    orders.update(fulfilled_on=F('updated_on'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0062_alter_archivedorderitem_product'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_fulfilled_on, migrations.RunPython.noop, elidable=True),
+    ]
@@ -1,12 +1,33 @@
 from collections import defaultdict
 
 from django.db import models
-from django.db.models import Prefetch, Sum, F
+from django.db.models import Count, Exists, F, OuterRef, Prefetch, Q, Sum
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from phonenumber_field.modelfields import PhoneNumberField
 
+from star_burger.cache import get_or_build
+
+from . import cache_keys
+
+
+class RestaurantQuerySet(models.QuerySet):
+    def annotate_active_orders(self):
+        '''Number of open orders assigned to the restaurant: new ones are waiting for it,
+        confirmed ones are being cooked
+        '''
+        return self.annotate(
+            active_orders=Count(
+                'orders',
+                filter=Q(orders__status__in=[Order.Status.NEW, Order.Status.CONFIRMED])
+            )
+        )
+
+    def get_active_orders(self):
+        '''Restaurant id -> active orders count, in a single query'''
+        return dict(self.annotate_active_orders().values_list('id', 'active_orders'))
+
 
 class Restaurant(models.Model):
     name = models.CharField(
@@ -24,6 +45,18 @@ class Restaurant(models.Model):
         max_length=50,
         blank=True,
     )
+    capacity = models.PositiveSmallIntegerField(
+        'вместимость',
+        null=True,
+        blank=True,
+        help_text='сколько заказов ресторан готовит одновременно, пусто - без ограничений'
+    )
+    updated_on = models.DateTimeField(
+        'дата/время изменения',
+        auto_now=True
+    )
+
+    objects = RestaurantQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'ресторан'
@@ -33,14 +66,44 @@ class Restaurant(models.Model):
         return self.name
 
 
+def normalize_search_text(text):
+    '''Text in a form compared by product search
+
+    SQLite changes letter case of ASCII only, so case is folded here
+    for both the indexed text and the queries.
+    '''
+    return text.casefold().replace('ё', 'е')
+
+
+def get_search_document(name, category_name=None):
+    return normalize_search_text(f'{name} {category_name or ""}'.strip())
+
+
 class ProductQuerySet(models.QuerySet):
     def available(self):
-        products = (
-            RestaurantMenuItem.objects
-            .filter(availability=True)
-            .values_list('product')
-        )
-        return self.filter(pk__in=products)
+        # A correlated EXISTS probes the menu index for every product found,
+        # IN would collect the whole menu first even for a few search results
+        menu_items = RestaurantMenuItem.objects.filter(product=OuterRef('pk'), availability=True)
+        return self.filter(Exists(menu_items))
+
+    def search(self, query):
+        '''Products with every word of the query in the name or the category name
+
+        Words match any part of a word, like admin search does. On PostgreSQL
+        the substring lookups use the trigram index of search_document.
+        '''
+        products = self
+        for word in normalize_search_text(query).split():
+            products = products.filter(search_document__contains=word)
+        return products
+
+    def update_search_documents(self, batch_size=1000):
+        '''Rebuild search_document of the products, no signals are sent'''
+        products = [
+            Product(id=product_id, search_document=get_search_document(name, category_name))
+            for product_id, name, category_name in self.values_list('id', 'name', 'category__name')
+        ]
+        Product.objects.bulk_update(products, ['search_document'], batch_size=batch_size)
 
 
 class ProductCategory(models.Model):
@@ -79,6 +142,16 @@ class Product(models.Model):
     image = models.ImageField(
         'картинка'
     )
+    optimized_image = models.ImageField(
+        'сжатая картинка',
+        blank=True,
+        editable=False,
+    )
+    webp_image = models.ImageField(
+        'картинка WebP',
+        blank=True,
+        editable=False,
+    )
     special_status = models.BooleanField(
         'спец.предложение',
         default=False,
@@ -89,6 +162,11 @@ class Product(models.Model):
         max_length=200,
         blank=True,
     )
+    search_document = models.TextField(
+        'текст для поиска',
+        blank=True,
+        editable=False,
+    )
 
     objects = ProductQuerySet.as_manager()
 
@@ -99,9 +177,28 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, update_fields=None, **kwargs):
+        # search_document is filled by a pre_save receiver from these fields
+        if update_fields is not None and {'name', 'category', 'category_id'}.intersection(update_fields):
+            update_fields = {*update_fields, 'search_document'}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
 
 class RestaurantMenuItemQuerySet(models.QuerySet):
     def get_restaurants_with_items(self):
+        '''Get associative dictionary with restaurants
+        and corresponding list of products from the shared cache
+
+        Only the whole menu is cached, filtered querysets are built every time.
+        '''
+        if self.query.has_filters():
+            return self.build_restaurants_with_items()
+        return get_or_build(
+            cache_keys.MENU_RESTAURANTS_WITH_ITEMS,
+            self.build_restaurants_with_items
+        )
+
+    def build_restaurants_with_items(self):
         '''Build associative dictionary with restaurants
         and corresponding list of products
         '''
@@ -109,14 +206,30 @@ class RestaurantMenuItemQuerySet(models.QuerySet):
 
         restaurants_with_items_query = (
             self.select_related('restaurant')
-            .select_related('product')
             .filter(availability=True)
         )
 
         for entry in restaurants_with_items_query:
-            restaurants_with_items[entry.restaurant].append(entry.product.id)
+            restaurants_with_items[entry.restaurant].append(entry.product_id)
+
+        return dict(restaurants_with_items)
+
+    def get_restaurants_menus(self):
+        '''Same as get_restaurants_with_items, but with product id sets
+        to check orders against
+        '''
+        return {
+            restaurant: set(items)
+            for restaurant, items in self.get_restaurants_with_items().items()
+        }
+
 
-        return restaurants_with_items
+def get_avaliable_restaurants(restaurants_menus, product_ids):
+    '''Restaurants whose menu has every one of the products'''
+    return [
+        restaurant for restaurant, menu in restaurants_menus.items()
+        if menu.issuperset(product_ids)
+    ]
 
 
 class RestaurantMenuItem(models.Model):
@@ -160,13 +273,13 @@ class OrderQuerySet(models.QuerySet):
                 to_attr='itemset')
             )
 
-        restaurants_with_items = RestaurantMenuItem.objects.get_restaurants_with_items()
+        restaurants_menus = RestaurantMenuItem.objects.get_restaurants_menus()
 
         for order in orders:
-            order.avaliable_restaurants = [
-                restaurant for restaurant, items in restaurants_with_items.items()
-                if set(items).issuperset([item.product.id for item in order.itemset])
-            ]
+            order.avaliable_restaurants = get_avaliable_restaurants(
+                restaurants_menus,
+                [item.product_id for item in order.itemset]
+            )
         
         return orders
 
@@ -245,12 +358,30 @@ class Order(models.Model):
         blank=True,
         db_index=True
     )
+    updated_on = models.DateTimeField(
+        'Дата/время изменения',
+        auto_now=True,
+        db_index=True
+    )
 
     objects = OrderQuerySet().as_manager()
 
     class Meta:
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
+        # Almost all orders are closed, these only cover the few open ones
+        indexes = [
+            models.Index(
+                fields=['status', 'created_on'],
+                condition=Q(status__in=[0, 1]),
+                name='order_open_status_created_idx',
+            ),
+            models.Index(
+                fields=['created_on'],
+                condition=Q(status=0, assigned_restaurant__isnull=True),
+                name='order_unassigned_created_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.phonenumber}, {self.address}'
@@ -293,3 +424,265 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return f'{self.product.name} - {self.quantity} шт.'
+
+
+class OrderEventQuerySet(models.QuerySet):
+    def since(self, seq):
+        '''Events after the given sequence number, oldest first'''
+        return self.filter(seq__gt=seq).order_by('seq')
+
+    def last_seq(self):
+        return self.order_by('-seq').values_list('seq', flat=True).first() or 0
+
+
+class OrderEvent(models.Model):
+    '''Append-only log of order changes
+
+    Consumers remember the seq of the last processed event and
+    resume from it with OrderEvent.objects.since(seq).
+    '''
+
+    class Kind(models.IntegerChoices):
+        CREATED = 0, _('Создан')
+        STATUS = 1, _('Изменён статус')
+        ASSIGNED = 2, _('Назначен ресторан')
+        CHANGED = 3, _('Изменён')
+
+    seq = models.BigAutoField(
+        'Номер события',
+        primary_key=True
+    )
+    # Plain id, not a foreign key: the log outlives archived orders
+    order_id = models.IntegerField(
+        'ID заказа',
+        db_index=True
+    )
+    kind = models.SmallIntegerField(
+        'Событие',
+        choices=Kind.choices
+    )
+    status = models.SmallIntegerField(
+        'Статус заказа',
+        choices=Order.Status.choices
+    )
+    assigned_restaurant_id = models.IntegerField(
+        'ID ресторана',
+        null=True,
+        blank=True
+    )
+    created_on = models.DateTimeField(
+        'Дата/время события',
+        default=timezone.now
+    )
+
+    objects = OrderEventQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Событие заказа'
+        verbose_name_plural = 'События заказов'
+
+    def __str__(self):
+        return f'#{self.seq} {self.get_kind_display()} {self.order_id}'
+
+    @classmethod
+    def for_order(cls, order, kind):
+        return cls(
+            order_id=order.id,
+            kind=kind,
+            status=order.status,
+            assigned_restaurant_id=order.assigned_restaurant_id,
+        )
+
+
+class ArchivedOrderQuerySet(models.QuerySet):
+    def annotate_price_total(self):
+        return self.annotate(price_total=Sum(F('items__price') * F('items__quantity')))
+
+
+class ArchivedOrder(models.Model):
+    '''Closed order moved out of the Order table by archive_orders
+
+    Keeps the id and every field of the original order.
+    '''
+
+    id = models.IntegerField(
+        'ID заказа',
+        primary_key=True
+    )
+    firstname = models.CharField(
+        'Имя',
+        max_length=40
+    )
+    lastname = models.CharField(
+        'Фамилия',
+        max_length=40
+    )
+    phonenumber = PhoneNumberField(
+        'Номер телефона'
+    )
+    address = models.CharField(
+        'Адрес',
+        max_length=200
+    )
+    status = models.SmallIntegerField(
+        'Статус заказа',
+        choices=Order.Status.choices
+    )
+    payment_method = models.SmallIntegerField(
+        'Способ оплаты',
+        choices=Order.PaymentMethod.choices
+    )
+    assigned_restaurant = models.ForeignKey(
+        Restaurant,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        verbose_name='Готовился в ресторане',
+        related_name='archived_orders'
+    )
+    note = models.TextField(
+        'Комментарий',
+        blank=True
+    )
+    created_on = models.DateTimeField(
+        'Дата/время создания',
+        db_index=True
+    )
+    confirmed_on = models.DateTimeField(
+        'Дата/время подтверждения',
+        null=True,
+        blank=True
+    )
+    fulfilled_on = models.DateTimeField(
+        'Дата/время исполнения',
+        null=True,
+        blank=True
+    )
+    updated_on = models.DateTimeField(
+        'Дата/время изменения'
+    )
+    archived_on = models.DateTimeField(
+        'Дата/время архивации',
+        default=timezone.now
+    )
+
+    objects = ArchivedOrderQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Архивный заказ'
+        verbose_name_plural = 'Архивные заказы'
+
+    def __str__(self):
+        return f'{self.phonenumber}, {self.address}'
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.IntegerField(
+        'ID позиции',
+        primary_key=True
+    )
+    product = models.ForeignKey(
+        Product,
+        # Archived sales outlive products removed from the catalog
+        on_delete=models.PROTECT,
+        verbose_name='Товар',
+        related_name='archived_demands'
+    )
+    price = models.DecimalField(
+        'цена за шт',
+        max_digits=8,
+        decimal_places=2
+    )
+    quantity = models.SmallIntegerField(
+        'Количество'
+    )
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,
+        verbose_name='Заказ',
+        related_name='items'
+    )
+
+    class Meta:
+        verbose_name = 'Позиция архивного заказа'
+        verbose_name_plural = 'Позиции архивных заказов'
+
+    def __str__(self):
+        return f'{self.product.name} - {self.quantity} шт.'
+
+
+def get_orders_history(*fields):
+    '''Values of both current and archived orders, for reports'''
+    return Order.objects.values(*fields).union(
+        ArchivedOrder.objects.values(*fields),
+        all=True,
+    )
+
+
+class SalesRollup(models.Model):
+    '''Daily sales of a product in a restaurant, maintained by rollup_sales'''
+
+    restaurant = models.ForeignKey(
+        Restaurant,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        verbose_name='ресторан',
+        related_name='sales'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        verbose_name='товар',
+        related_name='sales'
+    )
+    day = models.DateField(
+        'день',
+        db_index=True
+    )
+    quantity = models.PositiveIntegerField(
+        'продано, шт',
+        default=0
+    )
+    revenue = models.DecimalField(
+        'выручка',
+        max_digits=14,
+        decimal_places=2,
+        default=0
+    )
+    orders_count = models.PositiveIntegerField(
+        'заказов',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'продажи за день'
+        verbose_name_plural = 'продажи по дням'
+        unique_together = [
+            ['restaurant', 'product', 'day']
+        ]
+
+    def __str__(self):
+        return f'{self.day} {self.restaurant} - {self.product}'
+
+
+class RollupWatermark(models.Model):
+    '''How far a rollup has processed its source rows'''
+
+    name = models.CharField(
+        'название',
+        max_length=50,
+        unique=True
+    )
+    value = models.DateTimeField(
+        'обработано до',
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = 'отметка агрегации'
+        verbose_name_plural = 'отметки агрегации'
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
@@ -0,0 +1,111 @@
+import copy
+import threading
+import time
+
+from django.db.models import Count, Max
+
+from locations.models import Location
+from locations.spatial import GridIndex
+
+from .models import Restaurant
+
+
+# Restaurants the geocoder failed for are looked up again this often,
+# not on every request while it is down
+GEOCODER_RETRY_SECONDS = 60
+
+_lock = threading.Lock()
+_index = GridIndex()
+_index_version = None
+# Address and the time of the last change the index holds, by restaurant id
+_indexed_restaurants = {}
+_unlocated_ids = set()
+_retry_at = 0
+
+
+def get_index_version():
+    '''Number of restaurants and the time of the last change
+
+    Read from the DB, so every process sees changes made by the others
+    whatever cache backend is configured. The restaurants table is small,
+    so the aggregate is cheap next to the queries it saves.
+    '''
+    version = Restaurant.objects.aggregate(count=Count('id'), updated_on=Max('updated_on'))
+    return version['count'], version['updated_on']
+
+
+def locate_restaurants(index, restaurant_addresses):
+    '''Put the restaurants into the index by their addresses
+
+    Restaurants the geocoder failed for are left out, their ids are returned.
+    '''
+    locations = Location.objects.get_for_addresses(set(restaurant_addresses.values()))
+
+    unlocated_ids = set()
+    for restaurant_id, address in restaurant_addresses.items():
+        location = locations[address]
+        if location.coords is not None:
+            index.add(restaurant_id, *location.coords)
+        else:
+            index.remove(restaurant_id)
+            if location.pk is None:
+                unlocated_ids.add(restaurant_id)
+    return unlocated_ids
+
+
+def update_index(index, indexed_restaurants):
+    '''Add, move and remove restaurants changed since the index was updated
+
+    Only the changed restaurants are looked up, others keep their points.
+    Returns ids of the restaurants the geocoder failed for.
+    '''
+    restaurants = {
+        restaurant_id: (address, updated_on)
+        for restaurant_id, address, updated_on
+        in Restaurant.objects.exclude(address='').values_list('id', 'address', 'updated_on')
+    }
+
+    for restaurant_id in indexed_restaurants.keys() - restaurants.keys():
+        index.remove(restaurant_id)
+        del indexed_restaurants[restaurant_id]
+
+    changed_addresses = {}
+    for restaurant_id, restaurant in restaurants.items():
+        if indexed_restaurants.get(restaurant_id) != restaurant:
+            indexed_restaurants[restaurant_id] = restaurant
+            changed_addresses[restaurant_id] = restaurant[0]
+    return locate_restaurants(index, changed_addresses)
+
+
+def get_restaurant_index():
+    '''Spatial index of geocoded restaurants
+
+    Kept per process and updated when restaurants are saved or deleted.
+    The index is updated on a copy, so callers iterating the previous one
+    aren't affected.
+    '''
+    global _index, _index_version, _unlocated_ids, _retry_at
+
+    version = get_index_version()
+    with _lock:
+        retry_due = _unlocated_ids and time.monotonic() >= _retry_at
+        if _index_version == version and not retry_due:
+            return _index
+
+        index, indexed_restaurants = copy.deepcopy(_index), dict(_indexed_restaurants)
+        unlocated_ids = set()
+        if retry_due:
+            unlocated_ids = locate_restaurants(index, {
+                restaurant_id: indexed_restaurants[restaurant_id][0]
+                for restaurant_id in _unlocated_ids
+                if restaurant_id in indexed_restaurants
+            })
+        if _index_version != version:
+            unlocated_ids |= update_index(index, indexed_restaurants)
+
+        _index, _index_version = index, version
+        _indexed_restaurants.clear()
+        _indexed_restaurants.update(indexed_restaurants)
+        _unlocated_ids = unlocated_ids
+        _retry_at = time.monotonic() + GEOCODER_RETRY_SECONDS
+        return _index
@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Min, Sum
+from django.db.models.functions import TruncDate
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, RollupWatermark, SalesRollup
+
+
+SALES_WATERMARK = 'sales'
+
+
+def get_sales_watermark():
+    return RollupWatermark.objects.filter(name=SALES_WATERMARK).values_list('value', flat=True).first()
+
+
+def aggregate_sales(fulfilled_after, fulfilled_until):
+    '''Sales of current and archived orders fulfilled in the period
+
+    Orders are archived only once rolled up, so archived ones fall into
+    the period only when the rollup is rebuilt.
+    '''
+    sales = []
+    for items in (OrderItem.objects, ArchivedOrderItem.objects):
+        sales += (
+            items
+            .filter(
+                order__status=Order.Status.FULFILLED,
+                order__fulfilled_on__gt=fulfilled_after,
+                order__fulfilled_on__lte=fulfilled_until,
+            )
+            .annotate(day=TruncDate('order__fulfilled_on'))
+            .values('order__assigned_restaurant', 'product', 'day')
+            .annotate(
+                quantity_total=Sum('quantity'),
+                revenue_total=Sum(F('price') * F('quantity')),
+                orders_total=Count('order', distinct=True),
+            )
+            .order_by()
+        )
+    return sales
+
+
+def merge_sales(sales):
+    '''Add aggregated sales to the rollup rows, creating missing ones'''
+    if not sales:
+        return
+
+    days = {sale['day'] for sale in sales}
+    rollups = {
+        (rollup.restaurant_id, rollup.product_id, rollup.day): rollup
+        for rollup in SalesRollup.objects.filter(day__gte=min(days), day__lte=max(days))
+    }
+
+    # The same key comes from both current and archived orders
+    merged_keys = set()
+    for sale in sales:
+        key = (sale['order__assigned_restaurant'], sale['product'], sale['day'])
+        rollup = rollups.get(key)
+        if rollup is None:
+            rollup = SalesRollup(restaurant_id=key[0], product_id=key[1], day=key[2])
+            rollups[key] = rollup
+        merged_keys.add(key)
+
+        rollup.quantity += sale['quantity_total']
+        rollup.revenue += sale['revenue_total']
+        rollup.orders_count += sale['orders_total']
+
+    merged_rollups = [rollups[key] for key in merged_keys]
+    SalesRollup.objects.bulk_update(
+        [rollup for rollup in merged_rollups if rollup.pk is not None],
+        ['quantity', 'revenue', 'orders_count'],
+        batch_size=1000,
+    )
+    SalesRollup.objects.bulk_create([rollup for rollup in merged_rollups if rollup.pk is None], batch_size=1000)
+
+
+def rollup_sales(until, window=timedelta(days=7)):
+    '''Roll up orders fulfilled after the watermark and up to until
+
+    Works in windows of fulfilled_on, moving the watermark in the same
+    transaction as the rollup rows, so an interrupted run resumes where
+    it stopped. Returns the new watermark.
+    '''
+    while True:
+        with transaction.atomic():
+            watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=SALES_WATERMARK)
+
+            start = watermark.value
+            if start is None:
+                first_fulfilled_ons = [
+                    orders.filter(status=Order.Status.FULFILLED).aggregate(first=Min('fulfilled_on'))['first']
+                    for orders in (Order.objects, ArchivedOrder.objects)
+                ]
+                first_fulfilled_on = min(filter(None, first_fulfilled_ons), default=None)
+                if first_fulfilled_on is None:
+                    return None
+                start = first_fulfilled_on - timedelta(microseconds=1)
+
+            if start >= until:
+                return watermark.value
+
+            end = min(start + window, until)
+            merge_sales(list(aggregate_sales(start, end)))
+
+            watermark.value = end
+            watermark.save(update_fields=['value'])
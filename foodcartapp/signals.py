@@ -0,0 +1,135 @@
+import logging
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from star_burger.cache import invalidate
+
+from . import cache_keys
+from .images import IMAGE_ERRORS, optimize_image
+from .models import Order, OrderEvent, Product, ProductCategory, Restaurant, RestaurantMenuItem, get_search_document
+
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(pre_save, sender=Product)
+def update_search_document(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'search_document' not in update_fields:
+        return
+    instance.search_document = get_search_document(
+        instance.name,
+        instance.category.name if instance.category else None,
+    )
+
+
+@receiver(post_save, sender=ProductCategory)
+def update_category_search_documents(sender, instance, **kwargs):
+    Product.objects.filter(category=instance).update_search_documents()
+
+
+@receiver(post_delete, sender=ProductCategory)
+def update_uncategorized_search_documents(sender, instance, **kwargs):
+    # Products of the deleted category are left without one
+    Product.objects.filter(category__isnull=True).update_search_documents()
+
+
+def delete_unused_images(names):
+    '''Delete the files unless some product still points to them
+
+    Products sharing an image share its optimized versions too.
+    '''
+    names = set(filter(None, names))
+    if not names:
+        return
+    used_names = Product.objects.filter(
+        Q(image__in=names) | Q(optimized_image__in=names) | Q(webp_image__in=names),
+    ).values_list('image', 'optimized_image', 'webp_image')
+    for name in names.difference(*used_names):
+        default_storage.delete(name)
+
+
+@receiver(post_init, sender=Product)
+def remember_product_image(sender, instance, **kwargs):
+    instance._saved_image = instance.image.name
+    instance._saved_optimized_names = (instance.optimized_image.name, instance.webp_image.name)
+
+
+# Connected before invalidate_catalog, so the catalog is rebuilt with the new versions
+@receiver(post_save, sender=Product)
+def optimize_product_image(sender, instance, created, **kwargs):
+    if created and not instance.image or not created and instance.image.name == instance._saved_image:
+        return
+
+    optimized_fields = {'optimized_image': '', 'webp_image': ''}
+    if instance.image:
+        try:
+            optimized = optimize_image(instance.image.name)
+        except IMAGE_ERRORS:
+            # The original is served until optimize_images succeeds
+            logger.warning(
+                'Image %r of product %s is not optimized', instance.image.name, instance.id, exc_info=True,
+            )
+        else:
+            optimized_fields = {'optimized_image': optimized.jpeg_name, 'webp_image': optimized.webp_name}
+
+    sender.objects.filter(id=instance.id).update(**optimized_fields)
+    for field, name in optimized_fields.items():
+        setattr(instance, field, name)
+
+    # Versions of the previous image, files are kept if the transaction is rolled back
+    stale_names = set(instance._saved_optimized_names) - set(optimized_fields.values())
+    transaction.on_commit(lambda: delete_unused_images(stale_names))
+    remember_product_image(sender, instance)
+
+
+@receiver(post_delete, sender=Product)
+def delete_optimized_images(sender, instance, **kwargs):
+    names = instance._saved_optimized_names
+    transaction.on_commit(lambda: delete_unused_images(names))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_save, sender=Restaurant)
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def invalidate_catalog(sender, **kwargs):
+    invalidate(*cache_keys.CATALOG_KEYS)
+
+
+@receiver(pre_save, sender=Order)
+def fill_fulfilled_on(sender, instance, **kwargs):
+    # Sales are rolled up by fulfilled_on, without it the order would never be counted
+    if instance.status == Order.Status.FULFILLED and instance.fulfilled_on is None:
+        instance.fulfilled_on = timezone.now()
+
+
+@receiver(post_init, sender=Order)
+def remember_order_state(sender, instance, **kwargs):
+    instance._saved_state = (instance.status, instance.assigned_restaurant_id)
+
+
+@receiver(post_save, sender=Order)
+def log_order_event(sender, instance, created, **kwargs):
+    saved_status, saved_restaurant_id = instance._saved_state
+
+    if created:
+        kinds = [OrderEvent.Kind.CREATED]
+    else:
+        kinds = []
+        if instance.status != saved_status:
+            kinds.append(OrderEvent.Kind.STATUS)
+        if instance.assigned_restaurant_id != saved_restaurant_id:
+            kinds.append(OrderEvent.Kind.ASSIGNED)
+        kinds = kinds or [OrderEvent.Kind.CHANGED]
+
+    OrderEvent.objects.bulk_create([OrderEvent.for_order(instance, kind) for kind in kinds])
+    remember_order_state(sender, instance)
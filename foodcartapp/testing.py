@@ -0,0 +1,135 @@
+import json
+import os
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from locations.models import Location
+
+from .models import Order, OrderItem, Product, ProductCategory, Restaurant, RestaurantMenuItem
+
+
+DATA_PATH = os.path.join(settings.BASE_DIR, 'data.json')
+
+# Moscow bounding box, synthetic addresses are placed within it
+MIN_LAT, MAX_LAT = 55.57, 55.91
+MIN_LON, MAX_LON = 37.37, 37.84
+
+
+def random_coords(rand):
+    return rand.uniform(MIN_LAT, MAX_LAT), rand.uniform(MIN_LON, MAX_LON)
+
+
+def seed_dataset(scale=10, orders_count=50, items_per_order=3):
+    '''Fill DB with data.json entries multiplied by scale
+
+    Every restaurant and order address gets a pre-geocoded Location,
+    so nothing is fetched from the geocoder.
+    '''
+    with open(DATA_PATH, encoding='utf-8') as data_file:
+        entries = json.load(data_file)
+    fixtures = {
+        model: [entry['fields'] for entry in entries if entry['model'] == f'foodcartapp.{model}']
+        for model in ('restaurant', 'productcategory', 'product', 'restaurantmenuitem')
+    }
+
+    categories = [
+        ProductCategory.objects.create(name=fields['name'])
+        for fields in fixtures['productcategory']
+    ]
+    products = Product.objects.bulk_create([
+        Product(
+            name=f'{fields["name"]} #{copy}',
+            category=categories[copy % len(categories)],
+            price=Decimal(fields['price']),
+            image=fields['image'],
+            special_status=fields['special_status'],
+            description=fields['description'][:200],
+        )
+        for copy in range(scale)
+        for fields in fixtures['product']
+    ])
+    Product.objects.update_search_documents()
+    restaurants = Restaurant.objects.bulk_create([
+        Restaurant(
+            name=f'{fields["name"]} #{copy}',
+            address=f'{fields["address"]}, корпус {copy}',
+            contact_phone=fields['contact_phone'],
+        )
+        for copy in range(scale)
+        for fields in fixtures['restaurant']
+    ])
+    if not connections['default'].features.can_return_rows_from_bulk_insert:
+        products = list(Product.objects.order_by('id'))
+        restaurants = list(Restaurant.objects.order_by('id'))
+
+    RestaurantMenuItem.objects.bulk_create([
+        RestaurantMenuItem(
+            restaurant=restaurant,
+            product=product,
+            availability=(restaurant_number + product_number) % 5 != 0,
+        )
+        for restaurant_number, restaurant in enumerate(restaurants)
+        for product_number, product in enumerate(products)
+    ])
+
+    now = timezone.now()
+    orders = []
+    for order_number in range(orders_count):
+        orders.append(Order.objects.create(
+            firstname=f'Имя {order_number}',
+            lastname=f'Фамилия {order_number}',
+            phonenumber=f'+7916{order_number:07d}',
+            address=f'Москва, ул. Тестовая, {order_number}',
+            status=order_number % 2,
+            assigned_restaurant=restaurants[order_number % len(restaurants)] if order_number % 3 == 0 else None,
+            created_on=now - timedelta(minutes=order_number),
+        ))
+    OrderItem.objects.bulk_create([
+        OrderItem(
+            order=order,
+            product=products[(order_number + item_number) % len(products)],
+            price=products[(order_number + item_number) % len(products)].price,
+            quantity=item_number + 1,
+        )
+        for order_number, order in enumerate(orders)
+        for item_number in range(items_per_order)
+    ])
+
+    addresses = [restaurant.address for restaurant in restaurants] + [order.address for order in orders]
+    Location.objects.bulk_create([
+        Location(address=address, lat=55.70 + number % 20 / 100, lon=37.50 + number % 30 / 100)
+        for number, address in enumerate(addresses)
+    ])
+
+    return {
+        'products': products,
+        'restaurants': restaurants,
+        'orders': orders,
+    }
+
+
+class QueryBudgetMixin:
+    '''Assertions on the upper bound of SQL queries made by a block'''
+
+    @contextmanager
+    def assertMaxQueries(self, budget):
+        contexts = [CaptureQueriesContext(connections[alias]) for alias in self.databases]
+        for context in contexts:
+            context.__enter__()
+        try:
+            yield
+        finally:
+            for context in contexts:
+                context.__exit__(None, None, None)
+
+        queries = [query['sql'] for context in contexts for query in context.captured_queries]
+        self.assertLessEqual(
+            len(queries), budget,
+            f'{len(queries)} queries executed, budget is {budget}:\n' + '\n'.join(queries)
+        )
@@ -0,0 +1,547 @@
+import io
+import json
+import os
+import re
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+import requests
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.db.migrations.loader import MigrationLoader
+from django.db.models import F, ProtectedError, Sum
+from django.forms import modelform_factory
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from locations.models import Location
+
+from .admin import OrderAdminForm
+from .archive import archive_batch
+from .assignment import CapacityPolicy, assign_new_orders
+from .images import WEBP_SUPPORTED
+from .management.commands.bulk_loaddata import iter_json_array
+from .models import (
+    ArchivedOrder,
+    Order,
+    OrderItem,
+    Product,
+    ProductCategory,
+    Restaurant,
+    RestaurantMenuItem,
+    SalesRollup,
+    get_orders_history,
+)
+from .restaurant_index import get_restaurant_index
+from .rollups import get_sales_watermark, rollup_sales
+from .testing import QueryBudgetMixin, seed_dataset
+
+
+@mock.patch('locations.models.fetch_coordinates', side_effect=AssertionError('Geocoder must not be called'))
+class ApiQueriesTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_product_list(self, fetch_coordinates):
+        with self.assertMaxQueries(1):
+            response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertMaxQueries(0):
+            self.client.get('/api/products/')
+
+    def test_product_search(self, fetch_coordinates):
+        # Case of cyrillic letters is folded on SQLite too, words match in the name or the category
+        for query, expected_count in [('ЧИЗБУРГ', 10), ('лонг Бургер', 10), ('Воппер лонг', 0)]:
+            with self.assertMaxQueries(1):
+                products = self.client.get('/api/products/', {'q': query}).json()
+            self.assertEqual(len(products), expected_count, query)
+            self.assertTrue(all('Лонг Чизбургер' in product['name'] for product in products))
+
+        with self.assertMaxQueries(0):
+            response = self.client.get('/api/products/', {'q': 'чиз с луком'})
+        self.assertEqual(response.status_code, 400)
+
+        with mock.patch('foodcartapp.views.SEARCH_RESULTS_LIMIT', 3):
+            products = self.client.get('/api/products/', {'q': 'чизбургер'}).json()
+        self.assertEqual(len(products), 3)
+
+    def test_product_search_document(self, fetch_coordinates):
+        # Saving only some fields still refreshes the search document
+        product = Product.objects.get(id=self.dataset['products'][0].id)
+        product.name = 'Ёжик в тумане'
+        product.save(update_fields=['name'])
+        self.assertEqual(Product.objects.search('ежик').get(), product)
+
+    def test_start_page(self, fetch_coordinates):
+        with self.assertMaxQueries(1):
+            response = self.client.get(reverse('start_page'))
+        self.assertEqual(response.status_code, 200)
+
+        page = response.content.decode()
+        catalog = json.loads(re.search(r'<script id="catalog-data" type="application/json">(.*?)</script>', page).group(1))
+        self.assertEqual(catalog['products'], self.client.get('/api/products/').json())
+        self.assertEqual(catalog['banners'], self.client.get('/api/banners/').json())
+
+    def test_register_order(self, fetch_coordinates):
+        products = self.dataset['products'][:10]
+        order = {
+            'firstname': 'Иван',
+            'lastname': 'Иванов',
+            'phonenumber': '+79161234567',
+            'address': 'Москва, ул. Тестовая, 1',
+            'products': [{'product': product.id, 'quantity': 1} for product in products],
+        }
+
+        # Products lookup, savepoint, order, its event, items and the release
+        with self.assertMaxQueries(6):
+            response = self.client.post('/api/order/', order, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+
+class RestaurantMenuCacheTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset(scale=2, orders_count=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_filtered_menu(self):
+        restaurants = RestaurantMenuItem.objects.get_restaurants_with_items()
+        self.assertEqual(len(restaurants), len(self.dataset['restaurants']))
+        with self.assertMaxQueries(0):
+            RestaurantMenuItem.objects.get_restaurants_with_items()
+
+        # The cached whole menu isn't returned for a part of it
+        restaurant = self.dataset['restaurants'][0]
+        restaurants = RestaurantMenuItem.objects.filter(restaurant=restaurant).get_restaurants_with_items()
+        self.assertEqual(list(restaurants), [restaurant])
+
+
+@override_settings(DELIVERY_RADIUS_KM=50)
+@mock.patch('locations.models.fetch_coordinates', side_effect=AssertionError('Geocoder must not be called'))
+class DeliveryZoneTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset(scale=1, orders_count=1)
+        Location.objects.create(address='Санкт-Петербург, Невский пр-т, 1', lat=59.93, lon=30.33)
+
+    def setUp(self):
+        cache.clear()
+
+    def post_order(self, address):
+        return self.client.post('/api/order/', {
+            'firstname': 'Иван',
+            'lastname': 'Иванов',
+            'phonenumber': '+79161234567',
+            'address': address,
+            'products': [{'product': self.dataset['products'][0].id, 'quantity': 1}],
+        }, content_type='application/json')
+
+    @override_settings(DELIVERY_ZONE_MODE='reject')
+    def test_reject(self, fetch_coordinates):
+        response = self.post_order('Санкт-Петербург, Невский пр-т, 1')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('address', response.json())
+
+        response = self.post_order(self.dataset['orders'][0].address)
+        self.assertEqual(response.status_code, 200)
+
+    def test_warn(self, fetch_coordinates):
+        response = self.post_order('Санкт-Петербург, Невский пр-т, 1')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('warnings', response.json())
+        self.assertTrue(Order.objects.get(id=response.json()['id']).note)
+
+    def test_geocoder_errors(self, fetch_coordinates):
+        # Orders with addresses that can't be checked are let through
+        for error in [KeyError('response'), ValueError('Expecting value')]:
+            fetch_coordinates.side_effect = error
+            response = self.post_order(f'Москва, ул. Новая, {error}')
+            self.assertEqual(response.status_code, 200, error)
+            self.assertNotIn('warnings', response.json())
+            self.assertFalse(Order.objects.get(id=response.json()['id']).note)
+
+    @mock.patch('foodcartapp.restaurant_index.GEOCODER_RETRY_SECONDS', 0)
+    def test_restaurant_geocoder_outage(self, fetch_coordinates):
+        get_restaurant_index()
+        fetch_coordinates.side_effect = requests.Timeout()
+        restaurant = Restaurant.objects.create(name='Новый', address='Москва, ул. Новая, 2')
+
+        response = self.post_order(self.dataset['orders'][0].address)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(restaurant.id, get_restaurant_index())
+
+        # Once the geocoder is back, only that restaurant is looked up
+        fetch_coordinates.side_effect = None
+        fetch_coordinates.return_value = ('37.62', '55.75')
+        with mock.patch.object(Location.objects, 'get_for_addresses', wraps=Location.objects.get_for_addresses) as get:
+            self.assertIn(restaurant.id, get_restaurant_index())
+        get.assert_called_once_with({restaurant.address})
+
+
+@mock.patch('locations.models.fetch_coordinates', side_effect=AssertionError('Geocoder must not be called'))
+class AssignmentTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset(scale=1, orders_count=6)
+        Order.objects.update(status=Order.Status.NEW, assigned_restaurant=None)
+        RestaurantMenuItem.objects.update(availability=True)
+        Restaurant.objects.update(capacity=2)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_capacity_across_batches(self, fetch_coordinates):
+        restaurant = self.dataset['restaurants'][0]
+        Order.objects.filter(id=self.dataset['orders'][0].id).update(assigned_restaurant=restaurant)
+
+        # Orders assigned by the first batch are still new, yet they load the restaurants
+        self.assertEqual(assign_new_orders(CapacityPolicy(), batch_size=3), 3)
+        self.assertEqual(assign_new_orders(CapacityPolicy(), batch_size=3), 2)
+        self.assertEqual(assign_new_orders(CapacityPolicy(), batch_size=3), 0)
+
+        self.assertEqual(
+            set(Restaurant.objects.get_active_orders().values()),
+            {restaurant.capacity for restaurant in Restaurant.objects.all()},
+        )
+
+    @override_settings(GEOCODER='fake')
+    def test_new_address(self, fetch_coordinates):
+        order = self.dataset['orders'][0]
+        Order.objects.filter(id=order.id).update(address='Москва, ул. Новая, 1')
+
+        self.assertEqual(assign_new_orders(CapacityPolicy(), batch_size=10), 6)
+        self.assertTrue(Location.objects.filter(address='Москва, ул. Новая, 1').exists())
+
+    def test_bench_without_assignments(self, fetch_coordinates):
+        stdout = io.StringIO()
+        call_command('bench_assignment', orders=10, restaurants=0, stdout=stdout)
+        self.assertIn('assigned=0/10', stdout.getvalue())
+
+
+class ArchiveTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset(scale=1, orders_count=10)
+        Order.objects.filter(id__in=[order.id for order in cls.dataset['orders'][:4]]).update(
+            status=Order.Status.FULFILLED,
+            fulfilled_on=timezone.now() - timedelta(days=1),
+        )
+        rollup_sales(until=timezone.now())
+
+    def test_archive_batch(self):
+        created_before = timezone.now()
+        history_before = sorted(get_orders_history('id', 'status', 'address').values_list('id', 'status', 'address'))
+
+        self.assertEqual(archive_batch(created_before, batch_size=3), 3)
+        self.assertEqual(archive_batch(created_before, batch_size=3), 1)
+        self.assertEqual(archive_batch(created_before, batch_size=3), 0)
+
+        self.assertFalse(Order.objects.filter(status=Order.Status.FULFILLED).exists())
+        archived_order = ArchivedOrder.objects.annotate_price_total().get(id=self.dataset['orders'][0].id)
+        self.assertEqual(archived_order.items.count(), 3)
+        self.assertTrue(archived_order.price_total)
+        self.assertEqual(
+            sorted(get_orders_history('id', 'status', 'address').values_list('id', 'status', 'address')),
+            history_before
+        )
+
+        # Products with archived sales can't be deleted
+        with self.assertRaises(ProtectedError):
+            archived_order.items.first().product.delete()
+
+
+class SalesRollupTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset(scale=1, orders_count=10)
+        cls.now = timezone.now()
+        for number, order in enumerate(cls.dataset['orders']):
+            order.status = Order.Status.FULFILLED
+            order.fulfilled_on = cls.now - timedelta(days=number)
+            order.save()
+
+    def get_sold(self, orders):
+        return OrderItem.objects.filter(order__in=orders).aggregate(
+            quantity=Sum('quantity'),
+            revenue=Sum(F('price') * F('quantity')),
+        )
+
+    def get_rolled_up(self):
+        return SalesRollup.objects.aggregate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+
+    def test_incremental_rollup(self):
+        orders = self.dataset['orders']
+        sold_before_watermark = self.get_sold(orders[5:])
+        sold = self.get_sold(orders)
+
+        watermark = rollup_sales(until=self.now - timedelta(days=5), window=timedelta(days=2))
+        self.assertEqual(watermark, self.now - timedelta(days=5))
+        self.assertEqual(self.get_rolled_up(), sold_before_watermark)
+
+        # Only rolled up orders may leave the Order table
+        self.assertEqual(archive_batch(created_before=self.now, batch_size=10), 5)
+
+        rollup_sales(until=self.now)
+        rollup_sales(until=self.now)
+        self.assertEqual(self.get_rolled_up(), sold)
+        self.assertEqual(get_sales_watermark(), self.now)
+
+    def test_rebuild_with_archive(self):
+        rollup_sales(until=self.now)
+        rollups = set(SalesRollup.objects.values_list('restaurant', 'product', 'day', 'quantity', 'revenue'))
+        self.assertEqual(archive_batch(created_before=self.now, batch_size=5), 5)
+
+        # Half of the orders are archived, the other half is still current
+        call_command('rollup_sales', rebuild=True, lag_minutes=0, stdout=io.StringIO())
+        self.assertEqual(
+            set(SalesRollup.objects.values_list('restaurant', 'product', 'day', 'quantity', 'revenue')),
+            rollups,
+        )
+
+    def test_orders_without_fulfilled_on(self):
+        orders = self.dataset['orders']
+        sold = self.get_sold(orders)
+        Order.objects.filter(id=orders[0].id).update(fulfilled_on=None)
+
+        # Not rolled up, so not archived
+        rollup_sales(until=self.now)
+        self.assertEqual(archive_batch(created_before=self.now, batch_size=10), 9)
+        self.assertTrue(Order.objects.filter(id=orders[0].id).exists())
+
+        # Saving a fulfilled order fills the time in
+        order = Order.objects.get(id=orders[0].id)
+        order.save()
+        self.assertGreater(order.fulfilled_on, self.now)
+
+        rollup_sales(until=timezone.now())
+        self.assertEqual(archive_batch(created_before=self.now, batch_size=10), 1)
+        self.assertEqual(self.get_rolled_up(), sold)
+
+    def test_backdated_fulfillment(self):
+        rollup_sales(until=self.now)
+        order = Order.objects.create(
+            firstname='Иван', lastname='Иванов', phonenumber='+79161234567', address='Москва, ул. Тестовая, 1',
+        )
+        OrderForm = modelform_factory(Order, form=OrderAdminForm, fields=['status', 'fulfilled_on', 'assigned_restaurant'])
+
+        for fulfilled_on, is_valid in [(self.now - timedelta(days=1), False), (self.now + timedelta(hours=1), True)]:
+            form = OrderForm(instance=order, data={
+                'status': Order.Status.FULFILLED,
+                'fulfilled_on': fulfilled_on.strftime('%Y-%m-%d %H:%M:%S'),
+                'assigned_restaurant': '',
+            })
+            self.assertEqual(form.is_valid(), is_valid, form.errors)
+
+
+class BulkLoadDataTest(TestCase):
+    def test_json_array_blocks(self):
+        with open(os.path.join(settings.BASE_DIR, 'data.json'), encoding='utf-8') as fixture:
+            elements = json.load(fixture)
+            fixture.seek(0)
+            self.assertEqual(list(iter_json_array(fixture, block_size=7)), elements)
+
+    def test_load(self):
+        call_command('bulk_loaddata', os.path.join(settings.BASE_DIR, 'data.json'), chunk_size=2, stdout=io.StringIO())
+        self.assertEqual(Product.objects.count(), 4)
+        self.assertEqual(RestaurantMenuItem.objects.count(), 6)
+
+        # Sequences are moved past the loaded ids
+        category = ProductCategory.objects.create(name='Напитки')
+        self.assertGreater(category.id, ProductCategory.objects.exclude(id=category.id).get().id)
+
+
+@override_settings(GEOCODER='fake')
+class LoadTestCommandTest(LiveServerTestCase):
+    def setUp(self):
+        seed_dataset(scale=1, orders_count=1)
+
+    def test_orders_after_poll(self):
+        output = io.StringIO()
+        call_command(
+            'loadtest', url=self.live_server_url, duration=1, concurrency=1,
+            browse=0, order=1, poll_orders=1, stdout=output,
+        )
+        endpoints = json.loads(output.getvalue())['endpoints']
+
+        # Orders are placed by the same users who poll the manager page
+        self.assertEqual(endpoints['GET /manager/orders/']['errors'], 0)
+        self.assertEqual(endpoints['POST /api/order/']['errors'], 0)
+        self.assertEqual(Order.objects.count(), endpoints['POST /api/order/']['requests'] + 1)
+
+
+@override_settings(PRODUCT_IMAGE_MAX_SIZE=300)
+class ProductImagesTest(TransactionTestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.category = ProductCategory.objects.create(name='Бургеры')
+
+    def save_photo(self, name, size=(1200, 800), color='orange'):
+        photo = Image.new('RGB', size, color)
+        exif = photo.getexif()
+        exif[0x0112] = 6  # Rotated 90° clockwise
+        exif[0x010f] = 'Camera'
+        buffer = io.BytesIO()
+        if name.endswith('.png'):
+            photo.save(buffer, format='PNG')
+        else:
+            photo.save(buffer, format='JPEG', quality=100, exif=exif)
+        return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    def test_upload(self):
+        product = Product.objects.create(
+            name='Чизбургер', category=self.category, price=100, image=self.save_photo('cheeseburger.jpg'),
+        )
+        product.refresh_from_db()
+        self.assertEqual(product.optimized_image.name, 'cheeseburger.jpg.opt.jpg')
+        self.assertTrue(default_storage.exists('cheeseburger.jpg'))
+
+        with default_storage.open(product.optimized_image.name) as file, Image.open(file) as image:
+            self.assertEqual(image.size, (200, 300))
+            self.assertTrue(image.info.get('progressive'))
+            self.assertFalse(image.getexif())
+        if WEBP_SUPPORTED:
+            with default_storage.open(product.webp_image.name) as file, Image.open(file) as image:
+                self.assertEqual((image.format, image.size), ('WEBP', (200, 300)))
+
+        # Other changes don't encode the image again
+        with mock.patch('foodcartapp.signals.optimize_image') as optimize_image:
+            product.price = 120
+            product.save()
+        optimize_image.assert_not_called()
+
+    def test_stale_versions_deleted(self):
+        image_name = self.save_photo('burger.jpg')
+        burger, double_burger = [
+            Product.objects.create(name=name, category=self.category, price=100, image=image_name)
+            for name in ('Бургер', 'Двойной бургер')
+        ]
+        stale_names = {burger.optimized_image.name, burger.webp_image.name} - {''}
+        self.assertEqual(stale_names, {double_burger.optimized_image.name, double_burger.webp_image.name} - {''})
+
+        burger.image = self.save_photo('new-burger.jpg')
+        burger.save()
+        self.assertEqual(burger.optimized_image.name, 'new-burger.jpg.opt.jpg')
+        # Still used by the other product
+        self.assertTrue(all(default_storage.exists(name) for name in stale_names))
+
+        double_burger.delete()
+        self.assertFalse(any(default_storage.exists(name) for name in stale_names))
+
+        burger.image = ''
+        burger.save()
+        burger.refresh_from_db()
+        self.assertEqual((burger.optimized_image.name, burger.webp_image.name), ('', ''))
+        self.assertFalse(default_storage.exists('new-burger.jpg.opt.jpg'))
+
+    def test_same_stem(self):
+        jpeg_burger, png_burger = [
+            Product.objects.create(name=name, category=self.category, price=100, image=self.save_photo(name, color=color))
+            for name, color in [('burger.jpg', 'orange'), ('burger.png', 'green')]
+        ]
+        self.assertNotEqual(jpeg_burger.optimized_image.name, png_burger.optimized_image.name)
+
+        # Deleting one product keeps the versions of the other
+        png_burger.delete()
+        with default_storage.open(jpeg_burger.optimized_image.name) as file, Image.open(file) as image:
+            self.assertGreater(image.getpixel((0, 0))[0], 200)
+
+    def test_command(self):
+        # bulk_create sends no signals, like bulk_loaddata and seed_scale
+        image_name = self.save_photo('burger.jpg')
+        # Named by the stem only, as versions were before
+        old_name = default_storage.save('burger.opt.jpg', ContentFile(b'old version'))
+        Product.objects.bulk_create([
+            Product(name=f'Бургер {number}', price=100, image=image_name, optimized_image=old_name)
+            for number in range(2)
+        ] + [Product(name='Картошка', price=50, image='missing.jpg')])
+
+        with self.assertRaises(CommandError):
+            call_command('optimize_images', all=True, workers=2, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(
+            sorted(Product.objects.values_list('optimized_image', flat=True)),
+            ['', 'burger.jpg.opt.jpg', 'burger.jpg.opt.jpg'],
+        )
+        self.assertFalse(default_storage.exists(old_name))
+
+
+class SquashedMigrationsTest(SimpleTestCase):
+    def test_squashed_state(self):
+        # Fresh databases get the squashed migration, existing ones have the full history
+        history = MigrationLoader(None, replace_migrations=False)
+        squashed = MigrationLoader(None)
+        self.assertIn(('foodcartapp', '0001_squashed_0058'), squashed.graph.nodes)
+
+        history_state = history.project_state(('foodcartapp', '0058_salesrollup'))
+        squashed_state = squashed.project_state(('foodcartapp', '0001_squashed_0058'))
+        for app_label, model_name in history_state.models:
+            if app_label == 'foodcartapp':
+                self.assertEqual(
+                    squashed_state.models[app_label, model_name],
+                    history_state.models[app_label, model_name],
+                    model_name,
+                )
+        self.assertEqual(
+            {key for key in squashed_state.models if key[0] == 'foodcartapp'},
+            {key for key in history_state.models if key[0] == 'foodcartapp'},
+        )
+
+
+@mock.patch('locations.models.fetch_coordinates', side_effect=AssertionError('Geocoder must not be called'))
+class AdminQueriesTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset()
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def test_order_change_page(self, fetch_coordinates):
+        order = self.dataset['orders'][0]
+        url = reverse('admin:foodcartapp_order_change', args=(order.id,))
+
+        # Products are picked with autocomplete, only the chosen product of every item is fetched
+        with self.assertMaxQueries(13):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, f'<option value="{self.dataset["products"][-1].id}"')
+
+    def test_order_changelist(self, fetch_coordinates):
+        url = reverse('admin:foodcartapp_order_changelist')
+        order = self.dataset['orders'][0]
+
+        # Session, user, restaurants filter, count of filtered orders, page
+        # and the first and the last dates for the date hierarchy
+        with self.assertMaxQueries(7):
+            response = self.client.get(url, {'status__exact': order.status, 'created_on__year': order.created_on.year})
+        self.assertEqual(response.status_code, 200)
+
+        for search_term in [str(order.id), str(order.phonenumber), '8' + str(order.phonenumber)[2:]]:
+            response = self.client.get(url, {'q': search_term})
+            self.assertIn(order, response.context['cl'].result_list, search_term)
+        # Free text would be looked up with a table scan, so it isn't searched
+        response = self.client.get(url, {'q': 'Тестовая'})
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+    def test_product_search(self, fetch_coordinates):
+        response = self.client.get(reverse('admin:foodcartapp_product_changelist'), {'q': 'тройной ВОППЕР'})
+        self.assertEqual(response.context['cl'].result_count, 10)
@@ -1,16 +1,39 @@
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import transaction
 from django.http import JsonResponse
+from django.shortcuts import render
 from django.templatetags.static import static
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from rest_framework.serializers import ModelSerializer
+from rest_framework.serializers import IntegerField, ModelSerializer, ValidationError
 
-from .models import Order, OrderItem, Product
+from star_burger.cache import get_or_build
 
+from . import cache_keys
+from .delivery import is_in_delivery_zone
+from .models import Order, OrderItem, Product, normalize_search_text
 
-def banners_list_api(request):
+
+OUT_OF_ZONE_NOTE = 'Адрес вне зоны доставки'
+
+# Trigrams of shorter words aren't indexed, such a word scans the whole table
+SEARCH_MIN_WORD_LENGTH = 3
+SEARCH_RESULTS_LIMIT = 50
+
+# Same escaping as in json_script, but Cyrillic stays as is instead of \uXXXX
+JSON_SCRIPT_ESCAPES = {
+    ord('>'): '\\u003E',
+    ord('<'): '\\u003C',
+    ord('&'): '\\u0026',
+}
+
+
+def serialize_banners():
     # FIXME move data to db?
-    return JsonResponse([
+    return [
         {
             'title': 'Burger',
             'src': static('burger.jpg'),
@@ -26,14 +49,21 @@ def banners_list_api(request):
             'src': static('tasty.jpg'),
             'text': 'Food is incomplete without a tasty dessert',
         }
-    ], safe=False, json_dumps_params={
+    ]
+
+
+def banners_list_api(request):
+    banners = get_or_build(cache_keys.CATALOG_BANNERS, serialize_banners)
+    return JsonResponse(banners, safe=False, json_dumps_params={
         'ensure_ascii': False,
         'indent': 4,
     })
 
 
-def product_list_api(request):
+def serialize_products(query=''):
     products = Product.objects.select_related('category').available()
+    if query:
+        products = products.search(query).order_by('name', 'id')[:SEARCH_RESULTS_LIMIT]
 
     dumped_products = []
     for product in products:
@@ -47,20 +77,58 @@ def product_list_api(request):
                 'id': product.category.id,
                 'name': product.category.name,
             } if product.category else None,
-            'image': product.image.url,
+            # The original is served until its optimized versions are made
+            'image': (product.optimized_image or product.image).url,
+            'image_webp': product.webp_image.url if product.webp_image else None,
             'restaurant': {
                 'id': product.id,
                 'name': product.name,
             }
         }
         dumped_products.append(dumped_product)
+    return dumped_products
+
+
+def product_list_api(request):
+    query = request.GET.get('q', '').strip()
+    if any(len(word) < SEARCH_MIN_WORD_LENGTH for word in normalize_search_text(query).split()):
+        return JsonResponse(
+            {'q': [f'Каждое слово запроса должно быть не короче {SEARCH_MIN_WORD_LENGTH} символов']},
+            status=400,
+            json_dumps_params={'ensure_ascii': False},
+        )
+    if query:
+        # Search results are not cached, the index and the limit keep the query cheap
+        dumped_products = serialize_products(query)
+    else:
+        dumped_products = get_or_build(cache_keys.CATALOG_PRODUCTS, serialize_products)
     return JsonResponse(dumped_products, safe=False, json_dumps_params={
         'ensure_ascii': False,
         'indent': 4,
     })
 
 
+def dump_embedded_catalog():
+    '''Banners and products as JSON that is safe inside a <script> element'''
+    catalog = {
+        'banners': get_or_build(cache_keys.CATALOG_BANNERS, serialize_banners),
+        'products': get_or_build(cache_keys.CATALOG_PRODUCTS, serialize_products),
+    }
+    dumped_catalog = json.dumps(catalog, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':'))
+    return dumped_catalog.translate(JSON_SCRIPT_ESCAPES)
+
+
+def start_page(request):
+    # The storefront renders the embedded catalog without waiting for the API
+    return render(request, 'index.html', context={
+        'catalog_json': get_or_build(cache_keys.CATALOG_EMBEDDED, dump_embedded_catalog),
+    })
+
+
 class OrderItemSerializer(ModelSerializer):
+    # Products are looked up in bulk by OrderSerializer, not one query per item
+    product = IntegerField(min_value=1)
+
     class Meta:
         model = OrderItem
         fields = ['product', 'quantity']
@@ -73,6 +141,37 @@ class OrderSerializer(ModelSerializer):
         model = Order
         fields = ['id', 'firstname', 'lastname', 'phonenumber', 'address', 'products']
 
+    def validate_products(self, items):
+        product_ids = {item['product'] for item in items}
+        products = Product.objects.in_bulk(product_ids)
+
+        missing_ids = product_ids.difference(products.keys())
+        if missing_ids:
+            raise ValidationError(
+                f'Недопустимые первичные ключи товаров: {sorted(missing_ids)}'
+            )
+
+        for item in items:
+            item['product'] = products[item['product']]
+        return items
+
+    def validate(self, attrs):
+        # Not a field of the order, so it's handed to the view through the context
+        self.context['out_of_zone'] = False
+        if settings.DELIVERY_RADIUS_KM is None:
+            return attrs
+
+        product_ids = [item['product'].id for item in attrs['products']]
+        if is_in_delivery_zone(attrs['address'], product_ids) is not False:
+            return attrs
+
+        if settings.DELIVERY_ZONE_MODE == 'reject':
+            raise ValidationError({'address': [
+                f'{OUT_OF_ZONE_NOTE}: нет ресторанов с этими товарами ближе {settings.DELIVERY_RADIUS_KM} км'
+            ]})
+        self.context['out_of_zone'] = True
+        return attrs
+
 
 @transaction.atomic
 @api_view(['POST'])
@@ -84,7 +183,8 @@ def register_order(request):
         firstname=request_serializer.validated_data['firstname'],
         lastname=request_serializer.validated_data['lastname'],
         phonenumber=request_serializer.validated_data['phonenumber'],
-        address=request_serializer.validated_data['address']
+        address=request_serializer.validated_data['address'],
+        note=OUT_OF_ZONE_NOTE if request_serializer.context['out_of_zone'] else '',
     )
     order_items = [
         OrderItem(order=order, **fields).set_relevant_price()
@@ -93,5 +193,8 @@ def register_order(request):
     OrderItem.objects.bulk_create(order_items)
 
     response_serializer = OrderSerializer(order)
+    response_data = response_serializer.data
+    if request_serializer.context['out_of_zone']:
+        response_data['warnings'] = [OUT_OF_ZONE_NOTE]
 
-    return Response(response_serializer.data)
+    return Response(response_data)
@@ -1,3 +1,7 @@
+import hashlib
+import logging
+import math
+
 import requests
 from geopy import distance
 from django.conf import settings
@@ -5,13 +9,16 @@ from django.db import models
 from django.utils import timezone
 
 
+logger = logging.getLogger(__name__)
+
+
 def fetch_coordinates(apikey, address):
     base_url = "https://geocode-maps.yandex.ru/1.x"
     response = requests.get(base_url, params={
         "geocode": address,
         "apikey": apikey,
         "format": "json",
-    })
+    }, timeout=settings.GEOCODER_TIMEOUT)
     response.raise_for_status()
     found_places = response.json()['response']['GeoObjectCollection']['featureMember']
 
@@ -23,10 +30,49 @@ def fetch_coordinates(apikey, address):
     return lon, lat
 
 
+def fetch_fake_coordinates(apikey, address):
+    '''Stand-in for the geocoder: stable coordinates within Moscow, no network'''
+    # Imported here: foodcartapp depends on this app, not the other way round
+    from foodcartapp.testing import MAX_LAT, MAX_LON, MIN_LAT, MIN_LON
+
+    digest = hashlib.md5(address.encode('utf-8')).digest()
+    lat = MIN_LAT + int.from_bytes(digest[:4], 'big') / 2 ** 32 * (MAX_LAT - MIN_LAT)
+    lon = MIN_LON + int.from_bytes(digest[4:8], 'big') / 2 ** 32 * (MAX_LON - MIN_LON)
+    return str(round(lon, 6)), str(round(lat, 6))
+
+
+# Network failures and responses of unexpected shape
+GEOCODER_ERRORS = (requests.RequestException, ValueError, KeyError, IndexError)
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    '''Great-circle distance: less precise than geodesic, but much faster
+    when thousands of pairs have to be ranked
+    '''
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def geocode(address):
+    if settings.GEOCODER == 'fake':
+        return fetch_fake_coordinates(settings.GEO_API_KEY, address)
+    return fetch_coordinates(settings.GEO_API_KEY, address)
+
+
 class LocationManager(models.Manager):
     
     def get_for_addresses(self, addresses: set):
-        '''Get locations from DB; fetch and save any address that is missing'''
+        '''Get locations from DB; fetch and save any address that is missing
+
+        When the geocoder fails, the addresses left are returned unsaved
+        and without coordinates, so they are fetched again next time.
+        '''
 
         locations_from_db = {
             location.address: location for location 
@@ -35,8 +81,20 @@ class LocationManager(models.Manager):
 
         new_addresses = addresses.difference(locations_from_db.keys())
 
+        geocoder_failed = False
         for address in new_addresses:
-            coords = fetch_coordinates(settings.GEO_API_KEY, address)
+            if geocoder_failed:
+                locations_from_db[address] = Location(address=address)
+                continue
+
+            try:
+                coords = geocode(address)
+            except GEOCODER_ERRORS:
+                # The rest of the addresses would wait for the timeout too
+                logger.warning('Geocoder is unavailable, %r is not located', address, exc_info=True)
+                geocoder_failed = True
+                locations_from_db[address] = Location(address=address)
+                continue
             lon, lat = coords if coords else (None, None)
 
             location = self.create(
@@ -75,6 +133,12 @@ class Location(models.Model):
 
     objects = LocationManager()
 
+    @property
+    def coords(self):
+        if self.lat is None or self.lon is None:
+            return None
+        return float(self.lat), float(self.lon)
+
     def distance_to(self, other: 'Location'):
         if (self.lat and self.lon and other.lat and other.lon) is None:
             return
@@ -0,0 +1,108 @@
+import heapq
+import math
+from collections import defaultdict
+
+from .models import EARTH_RADIUS_KM, haversine_km
+
+
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+class GridIndex:
+    '''Points bucketed into cells of cell_km by cell_km degrees of latitude
+
+    Nearest neighbours are found by walking rings of cells around the
+    query point, so only its neighbourhood is scanned. Distances are
+    great-circle ones, the index is meant for city-sized areas.
+    '''
+
+    def __init__(self, cell_km=2):
+        self.cell_km = cell_km
+        self.cell_degrees = cell_km / KM_PER_DEGREE
+        self.cells = defaultdict(dict)
+        self.points = {}
+        # Cells shrink along longitude towards the poles
+        self.min_cos_lat = 1
+        # min row, max row, min col, max col of cells that ever had points.
+        # Removed points aren't subtracted, searches only walk a few empty rings more
+        self.bounds = None
+
+    def get_cell(self, lat, lon):
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def add(self, key, lat, lon):
+        self.remove(key)
+        self.points[key] = (lat, lon)
+        row, col = self.get_cell(lat, lon)
+        self.cells[row, col][key] = (lat, lon)
+        self.min_cos_lat = min(self.min_cos_lat, math.cos(math.radians(abs(lat))))
+
+        if self.bounds is None:
+            self.bounds = (row, row, col, col)
+        else:
+            min_row, max_row, min_col, max_col = self.bounds
+            self.bounds = (min(min_row, row), max(max_row, row), min(min_col, col), max(max_col, col))
+
+    def remove(self, key):
+        if key not in self.points:
+            return
+        cell = self.get_cell(*self.points.pop(key))
+        del self.cells[cell][key]
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, key):
+        return key in self.points
+
+    def iter_ring(self, row, col, ring):
+        if ring == 0:
+            yield row, col
+            return
+        for col_offset in range(-ring, ring + 1):
+            yield row - ring, col + col_offset
+            yield row + ring, col + col_offset
+        for row_offset in range(-ring + 1, ring):
+            yield row + row_offset, col - ring
+            yield row + row_offset, col + ring
+
+    def iter_nearest(self, lat, lon, keys=None):
+        '''Yield (distance in km, key) pairs, nearest first
+
+        keys limits the search to the given points.
+        '''
+        if not self.cells or keys is not None and not keys:
+            return
+
+        row, col = self.get_cell(lat, lon)
+        min_row, max_row, min_col, max_col = self.bounds
+        last_ring = max(row - min_row, max_row - row, col - min_col, max_col - col)
+        # Anything outside of ring N is at least this much farther than N cells
+        ring_km = self.cell_km * min(self.min_cos_lat, math.cos(math.radians(abs(lat))))
+
+        found = []
+        for ring in range(last_ring + 1):
+            for cell in self.iter_ring(row, col, ring):
+                for key, (point_lat, point_lon) in self.cells.get(cell, {}).items():
+                    if keys is None or key in keys:
+                        heapq.heappush(found, (haversine_km(lat, lon, point_lat, point_lon), key))
+
+            reached_km = ring * ring_km
+            while found and found[0][0] <= reached_km:
+                yield heapq.heappop(found)
+
+        while found:
+            yield heapq.heappop(found)
+
+    def nearest(self, lat, lon, k=None, radius_km=None, keys=None):
+        '''Up to k nearest points within radius_km as (distance in km, key) pairs'''
+        neighbours = []
+        for distance, key in self.iter_nearest(lat, lon, keys):
+            if radius_km is not None and distance > radius_km:
+                break
+            neighbours.append((distance, key))
+            if k is not None and len(neighbours) >= k:
+                break
+        return neighbours
@@ -0,0 +1,59 @@
+import random
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from .models import haversine_km
+from .spatial import GridIndex
+
+
+class GridIndexTest(SimpleTestCase):
+    def setUp(self):
+        rand = random.Random(42)
+        self.points = {
+            key: (rand.uniform(55.57, 55.91), rand.uniform(37.37, 37.84))
+            for key in range(500)
+        }
+        self.index = GridIndex(cell_km=1)
+        for key, coords in self.points.items():
+            self.index.add(key, *coords)
+        self.origin = (55.75, 37.62)
+
+    def brute_force(self, keys=None):
+        return sorted(
+            (haversine_km(*self.origin, *coords), key)
+            for key, coords in self.points.items()
+            if keys is None or key in keys
+        )
+
+    def test_nearest(self):
+        self.assertEqual(self.index.nearest(*self.origin, k=10), self.brute_force()[:10])
+
+    def test_nearest_within_radius(self):
+        expected = [(distance, key) for distance, key in self.brute_force() if distance <= 3]
+        self.assertEqual(self.index.nearest(*self.origin, radius_km=3), expected)
+
+    def test_nearest_among_keys(self):
+        keys = set(range(0, 500, 7))
+        self.assertEqual(self.index.nearest(*self.origin, k=5, keys=keys), self.brute_force(keys)[:5])
+
+    def test_moved_point(self):
+        self.index.add(0, *self.origin)
+        self.points[0] = self.origin
+        self.index.remove(1)
+        del self.points[1]
+        self.assertEqual(self.index.nearest(*self.origin, k=3), self.brute_force()[:3])
+
+    def test_bounds(self):
+        # Bounds are kept from the build, a query doesn't scan every cell
+        cells = self.index.cells
+        self.index.cells = mock.MagicMock(wraps=cells)
+        self.assertEqual(self.index.nearest(*self.origin, k=1), self.brute_force()[:1])
+        self.index.cells.__iter__.assert_not_called()
+        self.index.cells = cells
+
+        far = (55.95, 37.90)
+        self.index.add(500, *far)
+        self.points[500] = far
+        self.origin = (55.96, 37.95)
+        self.assertEqual(self.index.nearest(*self.origin, k=2), self.brute_force()[:2])
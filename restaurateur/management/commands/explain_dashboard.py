@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from foodcartapp.assignment import get_unassigned_orders
+from foodcartapp.models import OrderEvent, Restaurant
+
+from restaurateur.views import get_open_orders
+
+
+def get_dashboard_queries():
+    return {
+        'Open orders of the dashboard': get_open_orders(),
+        'Unassigned orders of the assignment engine': get_unassigned_orders()[:500],
+        'Active orders per restaurant': Restaurant.objects.annotate_active_orders(),
+        'Order events since the latest': OrderEvent.objects.since(OrderEvent.objects.last_seq())[:100],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Print execution plans of the manager dashboard queries. '
+        'On PostgreSQL the queries are run with EXPLAIN ANALYZE'
+    )
+
+    def handle(self, *args, **options):
+        explain_options = {}
+        if connection.vendor == 'postgresql':
+            explain_options = {'analyze': True, 'buffers': True}
+
+        for title, queryset in get_dashboard_queries().items():
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write('')
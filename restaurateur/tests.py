@@ -1,3 +1,221 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from foodcartapp.export import get_export_items
+from foodcartapp.models import Order, OrderItem, Restaurant
+from foodcartapp.restaurant_index import get_restaurant_index
+from foodcartapp.rollups import rollup_sales
+from foodcartapp.testing import QueryBudgetMixin, seed_dataset
+from locations.models import Location
+
+
+@mock.patch('locations.models.fetch_coordinates', side_effect=AssertionError('Geocoder must not be called'))
+class ManagerViewsQueriesTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset()
+        cls.manager = User.objects.create_user('manager', password='password', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.manager)
+
+    def test_orders(self, fetch_coordinates):
+        # Restaurant index is built once per process, only its version is read on every request
+        get_restaurant_index()
+
+        with self.assertMaxQueries(9):
+            response = self.client.get(reverse('restaurateur:view_orders'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_orders_unlocated_restaurant(self, fetch_coordinates):
+        order = next(
+            order for order in Order.objects.filter(assigned_restaurant__isnull=True).include_avaliable_restaurants()
+            if order.avaliable_restaurants
+        )
+        restaurant = order.avaliable_restaurants[-1]
+        Location.objects.filter(address=restaurant.address).update(lat=None, lon=None)
+        # Saved by another process, this one learns about it from the DB
+        Restaurant.objects.filter(id=restaurant.id).update(updated_on=timezone.now())
+
+        response = self.client.get(reverse('restaurateur:view_orders'))
+        order_serialized = next(item for item in response.context['orders'] if item['id'] == order.id)
+        self.assertEqual(order_serialized['avaliable_for'][-1]['name'], restaurant.name)
+        self.assertEqual(order_serialized['avaliable_for'][-1]['distance'], -1)
+
+    def test_geocoder_timeout(self, fetch_coordinates):
+        fetch_coordinates.side_effect = requests.Timeout()
+        order_ids = Order.objects.filter(assigned_restaurant__isnull=True).values_list('id', flat=True)[:2]
+        for number, order_id in enumerate(order_ids):
+            Order.objects.filter(id=order_id).update(address=f'Москва, ул. Новая, {number}')
+
+        response = self.client.get(reverse('restaurateur:view_orders'))
+        self.assertEqual(response.status_code, 200)
+        # The second address isn't sent to the geocoder that is down
+        fetch_coordinates.assert_called_once()
+        self.assertFalse(Location.objects.filter(address__startswith='Москва, ул. Новая').exists())
+
+    def test_products(self, fetch_coordinates):
+        with self.assertMaxQueries(5):
+            response = self.client.get(reverse('restaurateur:ProductsView'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_restaurants(self, fetch_coordinates):
+        with self.assertMaxQueries(4):
+            response = self.client.get(reverse('restaurateur:RestaurantView'))
+        self.assertEqual(response.status_code, 200)
+
+        for restaurant in response.context['restaurants']:
+            self.assertEqual(
+                restaurant.active_orders,
+                Order.objects.filter(
+                    assigned_restaurant=restaurant,
+                    status__in=[Order.Status.NEW, Order.Status.CONFIRMED],
+                ).count()
+            )
+
+
+@override_settings(ORDERS_FEED_TIMEOUT=0)
+@mock.patch('locations.models.fetch_coordinates', side_effect=AssertionError('Geocoder must not be called'))
+class OrdersFeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset(scale=1, orders_count=5)
+        cls.manager = User.objects.create_user('manager', password='password', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.manager)
+
+    def read_events(self, since):
+        response = self.client.get(reverse('restaurateur:view_orders_feed'), {'since': since})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = b''.join(response.streaming_content).decode()
+
+        events = []
+        for message in stream.split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in message.splitlines() if not line.startswith(':'))
+            if fields.get('event') == 'order':
+                events.append(json.loads(fields['data']))
+        return events
+
+    @override_settings(ORDERS_FEED_TIMEOUT=25)
+    def test_polling(self, fetch_coordinates):
+        # Without streaming the worker is released right away, the browser reconnects after the retry delay
+        with mock.patch('restaurateur.views.time.sleep', side_effect=AssertionError('Worker must not wait')):
+            self.assertEqual(self.read_events(since=0)[0]['id'], self.dataset['orders'][0].id)
+
+    def test_changed_orders(self, fetch_coordinates):
+        since = self.client.get(reverse('restaurateur:view_orders')).context['last_seq']
+        self.assertEqual(self.read_events(since), [])
+
+        changed_order, closed_order = self.dataset['orders'][:2]
+        changed_order.note = 'Позвонить заранее'
+        changed_order.save()
+        closed_order.status = Order.Status.CANCELED
+        closed_order.save()
+
+        events = self.read_events(since)
+        self.assertEqual([event['id'] for event in events], [changed_order.id, closed_order.id])
+        self.assertIn('Позвонить заранее', events[0]['html'])
+        self.assertIsNone(events[1]['html'])
+
+    def test_order_events(self, fetch_coordinates):
+        since = self.client.get(reverse('restaurateur:view_order_events')).json()['last_seq']
+
+        order = self.dataset['orders'][1]
+        order.status = Order.Status.CANCELED
+        order.assigned_restaurant = self.dataset['restaurants'][0]
+        order.save()
+
+        response = self.client.get(reverse('restaurateur:view_order_events'), {'since': since})
+        events = response.json()['events']
+        self.assertEqual([event['kind'] for event in events], ['status', 'assigned'])
+        self.assertEqual({event['order_id'] for event in events}, {order.id})
+        self.assertEqual(response.json()['last_seq'], events[-1]['seq'])
+
+
+@mock.patch('locations.models.fetch_coordinates', side_effect=AssertionError('Geocoder must not be called'))
+class OrdersExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset(scale=1, orders_count=5)
+        cls.manager = User.objects.create_user('manager', password='password', is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.manager)
+
+    def export(self, **params):
+        response = self.client.get(reverse('restaurateur:view_orders_export'), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv(self, fetch_coordinates):
+        rows = list(csv.DictReader(io.StringIO(self.export())))
+        self.assertEqual(len(rows), OrderItem.objects.count())
+        self.assertEqual([int(row['order_id']) for row in rows], sorted(int(row['order_id']) for row in rows))
+
+    def test_ndjson_filters(self, fetch_coordinates):
+        order = self.dataset['orders'][0]
+        order.status = Order.Status.CANCELED
+        order.save()
+
+        lines = self.export(format='ndjson', status='canceled', **{'from': order.created_on.date().isoformat()})
+        rows = [json.loads(line) for line in lines.splitlines()]
+        self.assertEqual({row['order_id'] for row in rows}, {order.id})
+        self.assertEqual(len(rows), order.items.count())
+
+    def test_command_stats(self, fetch_coordinates):
+        Order.objects.filter(id=self.dataset['orders'][0].id).update(address='Москва,\nул. Тестовая, 1')
+        stderr = io.StringIO()
+        call_command('export_orders', stats=True, stdout=io.StringIO(), stderr=stderr)
+        self.assertTrue(stderr.getvalue().startswith(f'{OrderItem.objects.count()} rows '), stderr.getvalue())
+
+    def test_archive_param(self, fetch_coordinates):
+        for archive, expected in [('0', False), ('false', False), ('', False), ('1', True), ('true', True)]:
+            with mock.patch('restaurateur.views.get_export_items', wraps=get_export_items) as export_items:
+                self.export(archive=archive)
+            self.assertIs(export_items.call_args.kwargs['archive'], expected, archive)
+
+    def test_invalid_params(self, fetch_coordinates):
+        for params in (
+            {'format': 'xml'}, {'status': 'lost'}, {'from': '2021-13-01'}, {'from': 'yesterday'}, {'archive': 'maybe'},
+        ):
+            response = self.client.get(reverse('restaurateur:view_orders_export'), params)
+            self.assertEqual(response.status_code, 400)
+
+
+@mock.patch('locations.models.fetch_coordinates', side_effect=AssertionError('Geocoder must not be called'))
+class SalesReportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset(scale=2, orders_count=6)
+        cls.manager = User.objects.create_user('manager', password='password', is_staff=True)
+        Restaurant.objects.update(name='Star Burger')
+        for order in cls.dataset['orders']:
+            order.status = Order.Status.FULFILLED
+            order.assigned_restaurant = cls.dataset['restaurants'][order.id % 2]
+            order.save()
+        rollup_sales(until=timezone.now())
+
+    def setUp(self):
+        self.client.force_login(self.manager)
+
+    def test_restaurants_with_same_name(self, fetch_coordinates):
+        response = self.client.get(reverse('restaurateur:view_sales_report'))
+        self.assertEqual(len(response.context['sales_by_restaurant']), 2)
+
+    def test_days(self, fetch_coordinates):
+        for days, expected_days in [('7', 7), ('week', 30), ('0', 1), ('10000000000', 3660)]:
+            response = self.client.get(reverse('restaurateur:view_sales_report'), {'days': days})
+            self.assertEqual(response.context['days'], expected_days, days)
@@ -14,6 +14,18 @@ urlpatterns = [
 
     path('orders/', views.view_orders, name="view_orders"),
 
+    path('orders/feed/', views.view_orders_feed, name="view_orders_feed"),
+
+    path('orders/events/', views.view_order_events, name="view_order_events"),
+
+    path('orders/export/', views.view_orders_export, name="view_orders_export"),
+
+    path('sales/', views.view_sales_report, name="view_sales_report"),
+
+    path('cache/', views.view_cache_stats, name="view_cache_stats"),
+
+    path('metrics/', views.view_request_metrics, name="view_request_metrics"),
+
     path('login/', views.LoginView.as_view(), name="login"),
     path('logout/', views.LogoutView.as_view(), name="logout"),
 ]
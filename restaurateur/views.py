@@ -1,17 +1,31 @@
+import json
+import time
 from collections import defaultdict
+from datetime import timedelta
 from operator import itemgetter
 
 from django import forms
+from django.conf import settings
 from django.contrib.auth.decorators import user_passes_test
 from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
-from django.db.models import Prefetch
+from django.db.models import Prefetch, Sum
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
-from django.urls import reverse_lazy
+from django.template.loader import render_to_string
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.views import View
 
-from foodcartapp.models import Order, OrderItem, Product, Restaurant, RestaurantMenuItem
+from foodcartapp.assignment import Candidate, LoadPolicy
+from foodcartapp.export import EXPORT_FORMATS, STATUS_NAMES, get_export_items, iter_export
+from foodcartapp.models import Order, OrderEvent, OrderItem, Product, Restaurant, RestaurantMenuItem, SalesRollup
+from foodcartapp.restaurant_index import get_restaurant_index
+from foodcartapp.rollups import get_sales_watermark
 from locations.models import Location
+from star_burger.cache import get_stats as get_cache_stats
+from star_burger.metrics import get_metrics
 
 
 class Login(forms.Form):
@@ -69,7 +83,7 @@ def is_manager(user):
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_products(request):
     restaurants = list(Restaurant.objects.order_by('name'))
-    products = list(Product.objects.prefetch_related('menu_items'))
+    products = list(Product.objects.select_related('category').prefetch_related('menu_items'))
 
     default_availability = {restaurant.id: False for restaurant in restaurants}
     products_with_restaurants = []
@@ -94,25 +108,42 @@ def view_products(request):
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_restaurants(request):
     return render(request, template_name="restaurants_list.html", context={
-        'restaurants': Restaurant.objects.all(),
+        'restaurants': Restaurant.objects.annotate_active_orders(),
     })
 
 
-@user_passes_test(is_manager, login_url='restaurateur:login')
-def view_orders(request):
-    orders_serialized = []
+OPEN_ORDER_STATUSES = (Order.Status.NEW, Order.Status.CONFIRMED)
+ORDER_EVENTS_LIMIT = 1000
+SALES_REPORT_DAYS = 30
+SALES_REPORT_MAX_DAYS = 3660
+BOOLEAN_PARAMS = {
+    '': False, '0': False, 'false': False, 'no': False, 'off': False,
+    '1': True, 'true': True, 'yes': True, 'on': True,
+}
+
 
-    orders = (
-        Order.objects.filter(status__in=(Order.Status.NEW, Order.Status.CONFIRMED))
+def get_open_orders():
+    return (
+        Order.objects.filter(status__in=OPEN_ORDER_STATUSES)
         .annotate_price_total()
         .order_by('status', '-created_on')
         .select_related('assigned_restaurant')
-        .include_avaliable_restaurants()
     )
 
+
+def serialize_orders(orders):
+    '''Prepare orders for the dashboard with the nearest restaurants
+    that can cook the unassigned ones
+    '''
+    orders_serialized = []
+
+    orders = orders.include_avaliable_restaurants()
+
     order_addresses = set([order.address for order in orders if order.assigned_restaurant is None])
-    restaurant_addresses = set(Restaurant.objects.values_list('address', flat=True))
-    relevant_locations = Location.objects.get_for_addresses(order_addresses.union(restaurant_addresses))
+    relevant_locations = Location.objects.get_for_addresses(order_addresses)
+    restaurant_index = get_restaurant_index()
+    restaurants_load = Restaurant.objects.get_active_orders()
+    load_policy = LoadPolicy()
 
     for order in orders:
         order_serialized = {
@@ -133,22 +164,234 @@ def view_orders(request):
             order_serialized['assigned_to'] = order.assigned_restaurant.name
         else:
             restaurants_with_distance = []
-            order_location = relevant_locations.get(order.address)
-            
-            for restaurant in order.avaliable_restaurants:
-                restaurant_location = relevant_locations.get(restaurant.address)
-                distance = order_location.distance_to(restaurant_location)
-                distance = round(distance, 3) if distance is not None else -1
-                restaurants_with_distance.append(
-                    {'name': restaurant.name, 'distance': distance}
+            avaliable_restaurants = {restaurant.id: restaurant for restaurant in order.avaliable_restaurants}
+            order_coords = relevant_locations[order.address].coords
+
+            if order_coords is None:
+                nearest_restaurants = [
+                    (-1, restaurant_id) for restaurant_id in avaliable_restaurants
+                ][:settings.NEAREST_RESTAURANTS_COUNT]
+            else:
+                nearest_restaurants = restaurant_index.nearest(
+                    *order_coords,
+                    k=settings.NEAREST_RESTAURANTS_COUNT,
+                    radius_km=settings.NEAREST_RESTAURANTS_RADIUS_KM,
+                    keys=avaliable_restaurants.keys(),
                 )
-
-            order_serialized['avaliable_for'] = sorted(restaurants_with_distance, key=itemgetter('distance'))
+                # Restaurants without coordinates aren't indexed, they are listed with unknown distance
+                nearest_restaurants += [
+                    (-1, restaurant_id) for restaurant_id in avaliable_restaurants
+                    if restaurant_id not in restaurant_index
+                ]
+
+            for distance, restaurant_id in nearest_restaurants:
+                restaurant = avaliable_restaurants[restaurant_id]
+                distance = round(distance, 3)
+                active_orders = restaurants_load.get(restaurant.id, 0)
+                restaurants_with_distance.append({
+                    'name': restaurant.name,
+                    'distance': distance,
+                    'active_orders': active_orders,
+                    # Restaurants with unknown distance go last
+                    'rank': (
+                        distance < 0,
+                        load_policy.score(Candidate(restaurant.id, distance, active_orders, restaurant.capacity)),
+                    ),
+                })
+
+            order_serialized['avaliable_for'] = sorted(restaurants_with_distance, key=itemgetter('rank'))
 
 
         orders_serialized.append(order_serialized)
 
+    return orders_serialized
+
+
+def parse_seq(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_days(value):
+    '''Length of the sales report, the default one for missing or invalid values'''
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        return SALES_REPORT_DAYS
+    # Larger values would overflow the date
+    return min(max(days, 1), SALES_REPORT_MAX_DAYS)
+
+
+def parse_export_date(value):
+    # parse_date returns None for strings that don't look like a date at all
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f'Invalid date {value!r}')
+    return day
+
+
+def get_changed_orders(since):
+    '''Orders changed after the event seq as (id, open, seq) by the last change'''
+    # Ordered by seq, so every order is left with its last change
+    last_seqs = dict(
+        OrderEvent.objects.since(since).values_list('order_id', 'seq')[:settings.ORDERS_FEED_BATCH_SIZE]
+    )
+    open_order_ids = set(
+        Order.objects.filter(id__in=last_seqs, status__in=OPEN_ORDER_STATUSES).values_list('id', flat=True)
+    )
+    return sorted(
+        [(order_id, order_id in open_order_ids, seq) for order_id, seq in last_seqs.items()],
+        key=itemgetter(2),
+    )
+
+
+def stream_order_events(since, next_url):
+    '''Server-Sent Events with dashboard rows of changed orders
+
+    Closed orders come with empty html to be removed from the page. The
+    stream ends after ORDERS_FEED_TIMEOUT, the browser then reconnects
+    sending the id of the last event. Without ORDERS_FEED_STREAMING the
+    changes are checked once, and the browser polls every ORDERS_FEED_POLL_SECONDS.
+    '''
+    timeout = settings.ORDERS_FEED_TIMEOUT if settings.ORDERS_FEED_STREAMING else 0
+    deadline = time.monotonic() + timeout
+    yield f'retry: {int(settings.ORDERS_FEED_POLL_SECONDS * 1000)}\n\n'
+
+    while True:
+        changes = get_changed_orders(since)
+        open_order_ids = [order_id for order_id, is_open, _ in changes if is_open]
+        rows = {}
+        if open_order_ids:
+            for order in serialize_orders(get_open_orders().filter(id__in=open_order_ids)):
+                rows[order['id']] = render_to_string('order_row.html', {
+                    'order': order,
+                    'next_url': next_url,
+                })
+
+        for order_id, _, since in changes:
+            event = json.dumps({'id': order_id, 'html': rows.get(order_id)}, ensure_ascii=False)
+            yield f'id: {since}\nevent: order\ndata: {event}\n\n'
+
+        if time.monotonic() >= deadline:
+            return
+        if not changes:
+            # Comment line keeps proxies from closing an idle connection
+            yield ': ping\n\n'
+            time.sleep(settings.ORDERS_FEED_POLL_SECONDS)
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_orders(request):
+    # Taken first, so changes made while the page renders come through the feed
+    last_seq = OrderEvent.objects.last_seq()
 
     return render(request, template_name='order_items.html', context={
-        'orders': orders_serialized,
+        'orders': serialize_orders(get_open_orders()),
+        'last_seq': last_seq,
+        'next_url': request.get_full_path(),
+    })
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_orders_feed(request):
+    since = parse_seq(request.META.get('HTTP_LAST_EVENT_ID') or request.GET.get('since'))
+    if since is None:
+        since = OrderEvent.objects.last_seq()
+    response = StreamingHttpResponse(
+        stream_order_events(since, reverse('restaurateur:view_orders')),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Don't let nginx buffer the events
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_orders_export(request):
+    export_format = request.GET.get('format', 'csv')
+    statuses = {name: status for status, name in STATUS_NAMES.items()}
+    try:
+        date_from, date_to = [
+            parse_export_date(request.GET[param]) if request.GET.get(param) else None
+            for param in ('from', 'to')
+        ]
+        selected_statuses = [statuses[name] for name in request.GET.getlist('status')]
+        archive = BOOLEAN_PARAMS[request.GET.get('archive', '').lower()]
+    except (KeyError, ValueError):
+        return HttpResponseBadRequest(
+            'Dates are expected as YYYY-MM-DD, archive as true or false and statuses as ' + ', '.join(statuses)
+        )
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest('Format is expected to be one of ' + ', '.join(EXPORT_FORMATS))
+
+    items = get_export_items(date_from, date_to, selected_statuses, archive=archive)
+    response = StreamingHttpResponse(
+        iter_export(items, export_format),
+        content_type='text/csv' if export_format == 'csv' else 'application/x-ndjson',
+    )
+    response['Content-Disposition'] = f'attachment; filename="orders.{export_format}"'
+    return response
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_sales_report(request):
+    days = parse_days(request.GET.get('days'))
+    sales = SalesRollup.objects.filter(day__gt=timezone.localdate() - timedelta(days=days))
+    totals = {
+        'quantity': Sum('quantity'),
+        'revenue': Sum('revenue'),
+        'orders': Sum('orders_count'),
+    }
+
+    return render(request, template_name='sales_report.html', context={
+        'days': days,
+        'watermark': get_sales_watermark(),
+        'sales_by_day': sales.values('day').annotate(**totals).order_by('-day'),
+        # Grouped by id, restaurants may share a name
+        'sales_by_restaurant': sales.values('restaurant', 'restaurant__name').annotate(**totals).order_by('-revenue'),
+        'top_products': sales.values('product', 'product__name').annotate(**totals).order_by('-revenue')[:20],
+    })
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_order_events(request):
+    since = parse_seq(request.GET.get('since')) or 0
+    limit = min(parse_seq(request.GET.get('limit')) or ORDER_EVENTS_LIMIT, ORDER_EVENTS_LIMIT)
+
+    events = [
+        {
+            'seq': event.seq,
+            'order_id': event.order_id,
+            'kind': OrderEvent.Kind(event.kind).name.lower(),
+            'status': Order.Status(event.status).name.lower(),
+            'assigned_restaurant_id': event.assigned_restaurant_id,
+            'created_on': event.created_on,
+        }
+        for event in OrderEvent.objects.since(since)[:limit]
+    ]
+    return JsonResponse({
+        'events': events,
+        'last_seq': events[-1]['seq'] if events else since,
+    }, json_dumps_params={
+        'ensure_ascii': False,
+        'indent': 4,
+    })
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_cache_stats(request):
+    return JsonResponse(get_cache_stats(), json_dumps_params={
+        'ensure_ascii': False,
+        'indent': 4,
+    })
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_request_metrics(request):
+    return JsonResponse(get_metrics(), json_dumps_params={
+        'ensure_ascii': False,
+        'indent': 4,
     })
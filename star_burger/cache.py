@@ -0,0 +1,65 @@
+import os
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+
+
+_MISSING = object()
+
+_stats = defaultdict(lambda: {
+    'hits': 0,
+    'misses': 0,
+    'lookup_seconds': 0.0,
+    'build_seconds': 0.0,
+})
+
+
+def get_or_build(key, build, timeout=None):
+    '''Get value from the shared cache; build and store it on a miss'''
+    key_stats = _stats[key]
+
+    started_at = time.perf_counter()
+    value = cache.get(key, _MISSING)
+    key_stats['lookup_seconds'] += time.perf_counter() - started_at
+
+    if value is not _MISSING:
+        key_stats['hits'] += 1
+        return value
+
+    key_stats['misses'] += 1
+    started_at = time.perf_counter()
+    value = build()
+    key_stats['build_seconds'] += time.perf_counter() - started_at
+
+    if timeout is None:
+        cache.set(key, value)
+    else:
+        cache.set(key, value, timeout)
+    return value
+
+
+def invalidate(*keys):
+    cache.delete_many(keys)
+
+
+def get_stats():
+    '''Hit/miss counters and average latencies of the current process'''
+    keys = {}
+    for key, key_stats in _stats.items():
+        lookups = key_stats['hits'] + key_stats['misses']
+        keys[key] = {
+            'hits': key_stats['hits'],
+            'misses': key_stats['misses'],
+            'hit_ratio': round(key_stats['hits'] / lookups, 3) if lookups else None,
+            'avg_lookup_ms': round(key_stats['lookup_seconds'] / lookups * 1000, 3) if lookups else None,
+            'avg_build_ms': (
+                round(key_stats['build_seconds'] / key_stats['misses'] * 1000, 3)
+                if key_stats['misses'] else None
+            ),
+        }
+
+    return {
+        'pid': os.getpid(),
+        'keys': keys,
+    }
@@ -0,0 +1,119 @@
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+
+# Counting fewer rows is cheap, and exact numbers are nicer to look at
+EXACT_COUNT_LIMIT = 10000
+
+
+def get_estimated_count(queryset):
+    '''Rows the PostgreSQL planner expects the queryset to return, None on other databases'''
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    '''Paginator which takes the count of a whole large table from planner statistics
+
+    COUNT(*) reads every matching row, for millions of orders it takes
+    longer than the page itself. The estimate of a whole table is close,
+    so the last pages may come out empty. Estimates of filtered rows
+    may be off by orders of magnitude, those are counted exactly.
+    '''
+
+    @cached_property
+    def count(self):
+        if self.object_list.query.has_filters():
+            return super().count
+        estimated_count = get_estimated_count(self.object_list)
+        if estimated_count is not None and estimated_count > EXACT_COUNT_LIMIT:
+            return estimated_count
+        return super().count
+
+
+def iter_periods(first, last, kind):
+    '''First day of every year, month or day from first to last date'''
+    period = date(first.year, 1 if kind == 'year' else first.month, first.day if kind == 'day' else 1)
+    while period <= last:
+        yield period
+        if kind == 'year':
+            period = period.replace(year=period.year + 1)
+        elif kind == 'month':
+            period = (period.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            period += timedelta(days=1)
+
+
+class DateRangeQuerySetMixin:
+    '''QuerySet methods for the admin date hierarchy which list periods from the first date to the last one
+
+    Django selects DISTINCT truncated dates, which reads every row. Here
+    only the bounds are read from the index, so periods without rows
+    are listed too.
+    '''
+
+    def get_date_bounds(self, field_name):
+        values = self.filter(**{f'{field_name}__isnull': False}).values_list(field_name, flat=True)
+        return values.order_by(field_name).first(), values.order_by(f'-{field_name}').first()
+
+    def dates(self, field_name, kind, order='ASC'):
+        first, last = self.get_date_bounds(field_name)
+        if first is None:
+            return []
+        periods = list(iter_periods(first, last, kind))
+        return periods[::-1] if order == 'DESC' else periods
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None, is_dst=None):
+        first, last = self.get_date_bounds(field_name)
+        if first is None:
+            return []
+        if settings.USE_TZ:
+            tzinfo = tzinfo or timezone.get_current_timezone()
+            first, last = timezone.localtime(first, tzinfo), timezone.localtime(last, tzinfo)
+
+        periods = []
+        for period in iter_periods(first.date(), last.date(), kind):
+            period = datetime.combine(period, time.min)
+            periods.append(timezone.make_aware(period, tzinfo) if settings.USE_TZ else period)
+        return periods[::-1] if order == 'DESC' else periods
+
+
+@lru_cache(maxsize=None)
+def get_date_range_queryset_class(queryset_class):
+    return type(f'DateRange{queryset_class.__name__}', (DateRangeQuerySetMixin, queryset_class), {})
+
+
+class LargeTableChangeList(ChangeList):
+    def get_queryset(self, request):
+        # The model's own queryset methods stay available, and _db is kept
+        # as is: actions write through this queryset and the router picks the database
+        queryset = super().get_queryset(request)._chain()
+        queryset.__class__ = get_date_range_queryset_class(type(queryset))
+        return queryset
+
+
+class LargeTableAdminMixin:
+    '''Changelist for tables with millions of rows
+
+    Counts are estimated, the unfiltered table isn't counted at all
+    and the date hierarchy is built from the first and the last dates.
+    '''
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return LargeTableChangeList
@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+
+DURATION_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def serialize(self):
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+        return {
+            'count': self.count,
+            'avg': round(self.total / self.count, 3) if self.count else None,
+            'buckets': dict(zip(bounds, self.counts)),
+        }
+
+
+class QueryTimer:
+    '''Execute wrapper counting queries and the time spent in the DB'''
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started_at
+            self.queries += 1
+
+
+_lock = threading.Lock()
+_views = defaultdict(lambda: {
+    'view_ms': Histogram(DURATION_BUCKETS_MS),
+    'db_ms': Histogram(DURATION_BUCKETS_MS),
+    'queries': Histogram(QUERY_COUNT_BUCKETS),
+})
+
+
+def record_request(view_name, view_ms, db_ms, queries):
+    with _lock:
+        view_metrics = _views[view_name]
+        view_metrics['view_ms'].observe(view_ms)
+        view_metrics['db_ms'].observe(db_ms)
+        view_metrics['queries'].observe(queries)
+
+
+def get_metrics():
+    '''Per-view histograms collected by the current process'''
+    with _lock:
+        views = {
+            view_name: {
+                metric: histogram.serialize()
+                for metric, histogram in view_metrics.items()
+            }
+            for view_name, view_metrics in _views.items()
+        }
+
+    return {
+        'pid': os.getpid(),
+        'views': views,
+    }
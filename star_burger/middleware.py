@@ -0,0 +1,130 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import QueryTimer, record_request
+from .routers import use_replica, write_happened
+
+
+class DatabaseHealthCheckMiddleware:
+    '''Drop persistent DB connections that went stale between requests
+
+    With CONN_MAX_AGE > 0 a connection may outlive a database restart or
+    a pooler reconnect, so it is checked once before the view is called.
+    '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        for connection in connections.all():
+            if connection.connection is not None and not connection.is_usable():
+                connection.close()
+
+        return self.get_response(request)
+
+
+class ReplicaRoutingMiddleware:
+    '''Serve read-only requests from the replica database
+
+    A client that has just written something is pinned to the primary
+    for REPLICA_PIN_SECONDS, so it always reads its own writes.
+    '''
+
+    cookie_name = 'pin_primary_until'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD') or self.is_pinned(request):
+            response = self.get_response(request)
+            is_write = request.method not in ('GET', 'HEAD')
+        else:
+            with use_replica():
+                response = self.get_response(request)
+                is_write = write_happened()
+            if response.streaming:
+                # The body is read after the view has returned
+                response.streaming_content = self.stream_from_replica(response.streaming_content)
+
+        if is_write:
+            pin_until = int(time.time()) + settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                self.cookie_name,
+                str(pin_until),
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def stream_from_replica(self, streaming_content):
+        # Headers are already sent, so a write here can't pin the client
+        with use_replica():
+            yield from streaming_content
+
+    def is_pinned(self, request):
+        try:
+            pin_until = int(request.COOKIES.get(self.cookie_name, 0))
+        except ValueError:
+            return False
+        return pin_until > time.time()
+
+
+class QueryTimingMiddleware:
+    '''Measure DB queries and view time of every request
+
+    Results are sent in the Server-Timing header and collected into
+    per-view histograms, see star_burger.metrics. A streamed body is
+    read after the headers are sent, so streaming responses get no
+    header and are recorded once the body is read.
+    '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+
+        started_at = time.perf_counter()
+        with self.timing_queries(timer):
+            response = self.get_response(request)
+
+        if response.streaming:
+            response.streaming_content = self.stream_timed(
+                request, response.streaming_content, timer, started_at,
+            )
+            return response
+
+        view_ms, db_ms = self.record(request, timer, started_at)
+        response['Server-Timing'] = (
+            f'db;dur={db_ms:.1f};desc="{timer.queries} SQL", '
+            f'app;dur={view_ms - db_ms:.1f}, '
+            f'total;dur={view_ms:.1f}'
+        )
+        return response
+
+    def timing_queries(self, timer):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+        return stack
+
+    def stream_timed(self, request, streaming_content, timer, started_at):
+        try:
+            with self.timing_queries(timer):
+                yield from streaming_content
+        finally:
+            self.record(request, timer, started_at)
+
+    def record(self, request, timer, started_at):
+        view_ms = (time.perf_counter() - started_at) * 1000
+        db_ms = timer.duration * 1000
+
+        resolver_match = request.resolver_match
+        view_name = resolver_match.view_name if resolver_match else 'unresolved'
+        record_request(view_name, view_ms, db_ms, timer.queries)
+        return view_ms, db_ms
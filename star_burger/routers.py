@@ -0,0 +1,78 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# Reads go to the primary unless replica reads are explicitly allowed,
+# so management commands and shell sessions never see a lagging replica
+_replica_reads_allowed = ContextVar('replica_reads_allowed', default=False)
+_write_happened = ContextVar('write_happened', default=False)
+
+# A session saved on login must be found by the very next request,
+# a lagging replica would log the user out
+PRIMARY_ONLY_APP_LABELS = {'auth', 'sessions'}
+
+
+@contextmanager
+def use_replica():
+    '''Route reads inside the block to the replica (until the first write)'''
+    allowed_token = _replica_reads_allowed.set(True)
+    written_token = _write_happened.set(False)
+    try:
+        yield
+    finally:
+        _write_happened.reset(written_token)
+        _replica_reads_allowed.reset(allowed_token)
+
+
+@contextmanager
+def use_primary():
+    '''Route reads inside the block to the primary database'''
+    token = _replica_reads_allowed.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads_allowed.reset(token)
+
+
+def write_happened():
+    return _write_happened.get()
+
+
+def is_same_database(alias, other_alias):
+    settings_dict = connections[alias].settings_dict
+    other_settings_dict = connections[other_alias].settings_dict
+    return all(
+        settings_dict.get(key) == other_settings_dict.get(key)
+        for key in ('ENGINE', 'NAME', 'HOST', 'PORT')
+    )
+
+
+class ReplicaRouter:
+    '''Send reads to the replica and writes to the primary database
+
+    Once anything is written, reads are pinned to the primary for the
+    rest of the block to keep read-your-writes consistency.
+    '''
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads_allowed.get() or _write_happened.get():
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label in PRIMARY_ONLY_APP_LABELS:
+            return DEFAULT_DB_ALIAS
+
+        if is_same_database(settings.REPLICA_DB_ALIAS, DEFAULT_DB_ALIAS):
+            # Replica is the primary itself, e.g. a test mirror. A second
+            # connection would not see data of the running transaction
+            return DEFAULT_DB_ALIAS
+        return settings.REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _write_happened.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replica holds the very same data as the primary
+        return True
@@ -5,6 +5,7 @@ import rollbar
 
 from environs import Env
 from git import Repo
+from git.exc import InvalidGitRepositoryError, NoSuchPathError
 
 
 env = Env()
@@ -17,6 +18,19 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 SECRET_KEY = env('SECRET_KEY')
 DEBUG = env.bool('DEBUG', True)
 GEO_API_KEY = env('GEO_API_KEY')
+GEOCODER = env.str('GEOCODER', 'yandex', validate=lambda geocoder: geocoder in ('yandex', 'fake'))
+LOAD_PENALTY_KM = env.float('LOAD_PENALTY_KM', 0.5)
+NEAREST_RESTAURANTS_COUNT = env.int('NEAREST_RESTAURANTS_COUNT', 5)
+NEAREST_RESTAURANTS_RADIUS_KM = env.float('NEAREST_RESTAURANTS_RADIUS_KM', None)
+GEOCODER_TIMEOUT = env.float('GEOCODER_TIMEOUT', 2)
+DELIVERY_RADIUS_KM = env.float('DELIVERY_RADIUS_KM', None)
+# Every open stream holds a worker, so it needs threaded or gevent gunicorn workers
+ORDERS_FEED_STREAMING = env.bool('ORDERS_FEED_STREAMING', False)
+ORDERS_FEED_TIMEOUT = env.float('ORDERS_FEED_TIMEOUT', 25)
+ORDERS_FEED_POLL_SECONDS = env.float('ORDERS_FEED_POLL_SECONDS', 2)
+ORDERS_FEED_BATCH_SIZE = 100
+DELIVERY_ZONE_MODE = env.str('DELIVERY_ZONE_MODE', 'warn', validate=lambda mode: mode in ('warn', 'reject'))
+PRODUCT_IMAGE_MAX_SIZE = env.int('PRODUCT_IMAGE_MAX_SIZE', 1200)
 
 ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', ['127.0.0.1', 'localhost'])
 
@@ -37,6 +51,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -109,8 +124,82 @@ if env.bool('REVERSE_PROXY', False):
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+DB_POOLER_MODE = env.bool('DB_POOLER_MODE', False)
+DB_CONN_MAX_AGE = env.int('DB_CONN_MAX_AGE', 60)
+DB_CONN_HEALTH_CHECKS = env.bool('DB_CONN_HEALTH_CHECKS', True)
+
 DATABASES = {
-    'default': dj_database_url.parse(env('POSTGRESQL_DB_URL'))
+    'default': dj_database_url.parse(
+        env('POSTGRESQL_DB_URL'),
+        conn_max_age=DB_CONN_MAX_AGE,
+    )
+}
+
+REPLICA_DB_ALIAS = env.str('REPLICA_DB_ALIAS', 'replica')
+REPLICA_DB_URL = env('REPLICA_DB_URL', None)
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', 5)
+
+if REPLICA_DB_URL:
+    DATABASES[REPLICA_DB_ALIAS] = dj_database_url.parse(
+        REPLICA_DB_URL,
+        conn_max_age=DB_CONN_MAX_AGE,
+    )
+    DATABASES[REPLICA_DB_ALIAS]['TEST'] = {'MIRROR': 'default'}
+
+    DATABASE_ROUTERS = ['star_burger.routers.ReplicaRouter']
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('whitenoise.middleware.WhiteNoiseMiddleware') + 1,
+        'star_burger.middleware.ReplicaRoutingMiddleware',
+    )
+
+if DB_POOLER_MODE:
+    # Transaction pooling (pgbouncer and alike) hands out a different server
+    # connection for every transaction, so named cursors can not survive
+    for database in DATABASES.values():
+        database['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+if DB_CONN_HEALTH_CHECKS and DB_CONN_MAX_AGE != 0:
+    # Static files are served by WhiteNoise before it and never touch the DB
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('whitenoise.middleware.WhiteNoiseMiddleware') + 1,
+        'star_burger.middleware.DatabaseHealthCheckMiddleware',
+    )
+
+if env.bool('REQUEST_METRICS', True):
+    MIDDLEWARE.insert(0, 'star_burger.middleware.QueryTimingMiddleware')
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    # Any server speaking the Redis protocol will do, requires django-redis
+    'redis': 'django_redis.cache.RedisCache',
+}
+CACHE_DEFAULT_LOCATIONS = {
+    'locmem': 'star_burger',
+    'file': os.path.join(BASE_DIR, '.cache'),
+    'redis': 'redis://127.0.0.1:6379/0',
+}
+CACHE_BACKEND = env.str(
+    'CACHE_BACKEND',
+    'locmem',
+    validate=lambda backend: backend in CACHE_BACKENDS,
+)
+
+DEPLOY_REVISION = env('DEPLOY_REVISION', None)
+if not DEPLOY_REVISION:
+    try:
+        DEPLOY_REVISION = Repo(path=BASE_DIR).head.commit.hexsha[:12]
+    except (InvalidGitRepositoryError, NoSuchPathError, ValueError):
+        DEPLOY_REVISION = 'unknown'
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': env('CACHE_LOCATION', CACHE_DEFAULT_LOCATIONS[CACHE_BACKEND]),
+        'TIMEOUT': env.int('CACHE_TIMEOUT', 300),
+        # Every deploy gets its own key space, so stale payloads never leak
+        'KEY_PREFIX': f'star_burger:{DEPLOY_REVISION}',
+    }
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -148,3 +237,10 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "assets"),
     os.path.join(BASE_DIR, "bundles"),
 ]
+
+if not DEBUG:
+    # collectstatic writes content-hashed copies with .gz and .br siblings,
+    # WhiteNoise serves them with far-future cache headers
+    STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+    # Django adds 12 hex digits of the file hash, parcel adds 8 to the assets it emits
+    WHITENOISE_IMMUTABLE_FILE_TEST = r'^.+\.[0-9a-f]{8,12}\..+$'
@@ -0,0 +1,136 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from foodcartapp.models import Order, OrderQuerySet
+from foodcartapp.testing import seed_dataset
+
+from .changelist import DateRangeQuerySetMixin, EstimatedCountPaginator
+from .middleware import DatabaseHealthCheckMiddleware, QueryTimingMiddleware, ReplicaRoutingMiddleware
+from .routers import ReplicaRouter, use_replica
+
+
+class DatabaseHealthCheckMiddlewareTest(SimpleTestCase):
+    def make_connection(self, connected=True, usable=True):
+        connection = mock.Mock()
+        connection.connection = object() if connected else None
+        connection.is_usable.return_value = usable
+        return connection
+
+    def test_stale_connection_closed(self):
+        stale, alive, closed = self.make_connection(usable=False), self.make_connection(), self.make_connection(False)
+        middleware = DatabaseHealthCheckMiddleware(lambda request: HttpResponse())
+
+        with mock.patch('star_burger.middleware.connections') as connections:
+            connections.all.return_value = [stale, alive, closed]
+            middleware(RequestFactory().get('/'))
+
+        stale.close.assert_called_once_with()
+        alive.close.assert_not_called()
+        # Django opens a missing connection on its own
+        closed.is_usable.assert_not_called()
+
+    def test_static_files_not_checked(self):
+        self.assertGreater(
+            settings.MIDDLEWARE.index('star_burger.middleware.DatabaseHealthCheckMiddleware'),
+            settings.MIDDLEWARE.index('whitenoise.middleware.WhiteNoiseMiddleware'),
+        )
+
+
+class QueryTimingMiddlewareTest(TestCase):
+    def stream_orders(self, request):
+        return StreamingHttpResponse(str(Order.objects.count()) for chunk in range(2))
+
+    @mock.patch('star_burger.middleware.record_request')
+    def test_streaming(self, record_request):
+        response = QueryTimingMiddleware(self.stream_orders)(RequestFactory().get('/'))
+        # The header would be sent before the queries are made
+        self.assertNotIn('Server-Timing', response)
+        record_request.assert_not_called()
+
+        self.assertEqual(b''.join(response.streaming_content), b'00')
+        view_name, view_ms, db_ms, queries = record_request.call_args.args
+        self.assertEqual((view_name, queries), ('unresolved', 2))
+
+
+@override_settings(REPLICA_DB_ALIAS='reader')
+@mock.patch('star_burger.routers.is_same_database', return_value=False)
+class ReplicaRoutingTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def read_order(self, request):
+        return HttpResponse(self.router.db_for_read(Order))
+
+    def stream_orders(self, request):
+        return StreamingHttpResponse(self.router.db_for_read(Order) for chunk in range(2))
+
+    def write_order(self, request):
+        self.router.db_for_write(Order)
+        return HttpResponse(self.router.db_for_read(Order))
+
+    def test_router(self, is_same_database):
+        self.assertEqual(self.router.db_for_read(Order), 'default')
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(Order), 'reader')
+            self.assertEqual(self.router.db_for_read(User), 'default')
+            self.assertEqual(self.router.db_for_read(Session), 'default')
+
+            self.assertEqual(self.router.db_for_write(Order), 'default')
+            self.assertEqual(self.router.db_for_read(Order), 'default')
+
+    def test_middleware(self, is_same_database):
+        factory = RequestFactory()
+        cookie_name = ReplicaRoutingMiddleware.cookie_name
+
+        response = ReplicaRoutingMiddleware(self.read_order)(factory.get('/'))
+        self.assertEqual(response.content, b'reader')
+        self.assertNotIn(cookie_name, response.cookies)
+
+        response = ReplicaRoutingMiddleware(self.write_order)(factory.get('/'))
+        self.assertEqual(response.content, b'default')
+        self.assertIn(cookie_name, response.cookies)
+
+        response = ReplicaRoutingMiddleware(self.read_order)(factory.post('/'))
+        self.assertEqual(response.content, b'default')
+        pin_cookie = response.cookies[cookie_name]
+
+        # The client reads its own writes until the cookie expires
+        request = factory.get('/')
+        request.COOKIES[cookie_name] = pin_cookie.value
+        self.assertEqual(ReplicaRoutingMiddleware(self.read_order)(request).content, b'default')
+
+    def test_streaming(self, is_same_database):
+        response = ReplicaRoutingMiddleware(self.stream_orders)(RequestFactory().get('/'))
+        self.assertEqual(b''.join(response.streaming_content), b'readerreader')
+
+
+@mock.patch('locations.models.fetch_coordinates', side_effect=AssertionError('Geocoder must not be called'))
+class LargeTableChangeListTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset()
+        cls.manager = User.objects.create_superuser('manager', 'manager@example.com', 'password')
+
+    @mock.patch('star_burger.changelist.get_estimated_count', return_value=10 ** 6)
+    def test_estimated_count(self, get_estimated_count, fetch_coordinates):
+        self.assertEqual(EstimatedCountPaginator(Order.objects.all(), 100).count, 10 ** 6)
+        # Estimates of filtered rows are too rough
+        orders = Order.objects.filter(status=Order.Status.NEW)
+        self.assertEqual(EstimatedCountPaginator(orders, 100).count, orders.count())
+
+    def test_queryset_methods(self, fetch_coordinates):
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('admin:foodcartapp_order_changelist'))
+        queryset = response.context['cl'].queryset
+
+        self.assertIsInstance(queryset, OrderQuerySet)
+        self.assertIsInstance(queryset, DateRangeQuerySetMixin)
+        # Periods come from the first and the last dates only
+        years = queryset.datetimes('created_on', 'year')
+        self.assertEqual(years[0].year, queryset.order_by('created_on')[0].created_on.year)